@@ -1,13 +1,50 @@
 import threading
-import time
 import random
+import math
 import queue
 import logging
+from collections import namedtuple
+
+from simulation_clock import RealTimeClock
+from metrics_buffer import MetricsBuffer, TimeWeightedAverage
+from latency import TaskLatency
+from event_trace import TRANSFER_START, TRANSFER_END, EXECUTION_START, COMPLETE, NODE_FAILURE, NODE_RECOVERY
+
+# Зарезервированные на ноде ресурсы под одну задачу
+TaskReservation = namedtuple("TaskReservation", ["node", "task_compute_demand", "task_data_size"])
+
+
+class _ClusterField:
+    def __init__(self, array_name: str):
+        """
+        Параметр или состояние ClusterNode, которое хранится либо в самом объекте,
+        либо в массиве ClusterState, если нода подключена к кластеру.
+
+        :param array_name: Имя массива в ClusterState.
+        """
+        self.array_name = array_name
+
+    def __set_name__(self, owner, name):
+        self.private_name = "_" + name
+
+    def __get__(self, node, owner):
+        if node is None:
+            return self
+        if node._cluster is None:
+            return getattr(node, self.private_name)
+        return getattr(node._cluster, self.array_name)[node._cluster_index].item()
+
+    def __set__(self, node, value):
+        if node._cluster is None:
+            setattr(node, self.private_name, value)
+        else:
+            getattr(node._cluster, self.array_name)[node._cluster_index] = value
+
 
 class Node:
     def __init__(self, node_id: int, compute_power_flops: float, delay_seconds: float,
                  bandwidth_bytes: float, failure_probability: float,
-                 downtime_seconds: float):
+                 downtime_seconds: float, clock=None, rng: random.Random = None, history_capacity: int = None):
         """
    #     Класс вычислительной ноды.
 
@@ -17,7 +54,13 @@ class Node:
         :param bandwidth_bytes: Пропускная способность канала для задачи (в байтах/сек).
         :param failure_probability: Вероятность отключения ноды (0.0 - 1.0).
         :param downtime_seconds: Время отключения ноды (в секундах).
+        :param clock: Часы симуляции (RealTimeClock, TimerHeapClock, AsyncioClock или VirtualClock). По умолчанию реальное время.
+        :param rng: Генератор случайных чисел ноды (для воспроизводимости - из SeedStream).
+        :param history_capacity: Сколько последних точек хранить в каждой истории метрик
+                                 (по умолчанию - все точки).
         """
+        self._cluster = None    # ClusterState, если нода - представление кластера
+        self._cluster_index = None
         self.node_id = node_id
         self.compute_power_flops = compute_power_flops
         self.delay_seconds = delay_seconds
@@ -31,12 +74,70 @@ class Node:
         self.lock = threading.Lock()
         self.task_queue = queue.Queue()
         self.done_tasks_count = 0   # количество выполненных задач
+        self.clock = clock if clock is not None else RealTimeClock()
+        self.start_time = self.clock.now()
+        self._failure_process_active = False
+        self._failure_rate = 0.0    # интенсивность отказов событийной модели (start_failure_process)
+        self.rng = rng if rng is not None else random.Random()
+        self._listeners = []    # подписчики на изменение состояния ноды (индексы дистрибьюторов)
+        self.trace = None       # EventTrace для событий ноды (EventTrace.attach_nodes)
 
 
         # Для сбора статистики
-        self.load_history = []  # [(relative_time, load_flops)]
-        self.network_load_history = []  # [(relative_time, network_load_bytes)]
-        self.running_tasks_history = []  # [(relative_time, running_tasks_count)]
+        self.load_history = MetricsBuffer(capacity=history_capacity)  # [(relative_time, load_flops)]
+        self.network_load_history = MetricsBuffer(capacity=history_capacity)  # [(relative_time, network_load_bytes)]
+        self.running_tasks_history = MetricsBuffer("q", capacity=history_capacity)  # [(relative_time, running_tasks_count)]
+        # Средние взвешенные по времени, обновляются вместе с историями
+        self.load_average = TimeWeightedAverage()   # загрузка (%)
+        self.network_load_average = TimeWeightedAverage()   # загрузка сети (%)
+        self.running_tasks_average = TimeWeightedAverage()  # количество задач
+        # Гистограммы задержек выполненных задач по этапам (очередь, передача, ожидание, выполнение, всего)
+        self.task_latency = TaskLatency()
+
+    def attach_cluster(self, cluster, index: int):
+        """
+        Делает ноду представлением элемента index кластера: текущие параметры и состояние
+        ноды копируются в массивы ClusterState, дальше читаются и записываются там
+        (класс ноды меняется на ClusterNode или, для подкласса Node, на его вариант
+        с полями кластера - см. cluster_node_class). Вызывается из ClusterState.
+        """
+        with self.lock:
+            for name in cluster.FIELDS:
+                getattr(cluster, name)[index] = getattr(self, name)
+                self.__dict__.pop(name, None)
+            self._cluster = cluster
+            self._cluster_index = index
+            self.__class__ = cluster_node_class(type(self))
+
+    def subscribe(self, callback):
+        """
+        Подписывает callback(node) на изменения состояния ноды: количество задач,
+        загрузка, отключение и восстановление.
+        """
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _notify(self):
+        """
+        Сообщает подписчикам об изменении состояния. Вызывается вне self.lock.
+        """
+        for callback in self._listeners:
+            callback(self)
+
+    def update_params(self, **params):
+        """
+        Изменяет параметры ноды (compute_power_flops, delay_seconds, bandwidth_bytes,
+        failure_probability, downtime_seconds) и уведомляет подписчиков.
+        """
+        with self.lock:
+            for name, value in params.items():
+                if name not in ("compute_power_flops", "delay_seconds", "bandwidth_bytes",
+                                "failure_probability", "downtime_seconds"):
+                    raise AttributeError(f"Node has no parameter '{name}'")
+                setattr(self, name, value)
+        self._notify()
 
     def get_current_tasks_on_node(self):
         return self.running_tasks_count
@@ -59,61 +160,150 @@ class Node:
             return (self.current_load_flops + task_compute_demand <= self.compute_power_flops and
                     self.current_network_load_bytes + task_data_size <= self.bandwidth_bytes)
 
-    def add_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+    def try_reserve(self, task_compute_demand: float, task_data_size: float):
         """
-        Добавляет задачу в очередь для выполнения.
+        Атомарно проверяет, может ли нода принять задачу, и резервирует под нее ресурсы
+        (одна блокировка на проверку и изменение).
 
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
-        :param task_id: Идентификатор задачи.
+        :return: TaskReservation или None, если нода отключена или ресурсов не хватает.
         """
-        if self.can_accept_task(task_compute_demand, task_data_size):
-            with self.lock:
+        with self.lock:
+            if (self.is_down or
+                    self.current_load_flops + task_compute_demand > self.compute_power_flops or
+                    self.current_network_load_bytes + task_data_size > self.bandwidth_bytes):
+                return None
+            self.current_load_flops += task_compute_demand
+            self.current_network_load_bytes += task_data_size
+            self.running_tasks_count += 1
+        self._notify()
+        return TaskReservation(self, task_compute_demand, task_data_size)
+
+    def try_reserve_many(self, tasks: list) -> list:
+        """
+        Резервирует ресурсы под несколько задач за одну блокировку (по порядку задач).
+
+        :param tasks: Список (task_compute_demand, task_data_size).
+        :return: Список TaskReservation (None для задач, которым не хватило ресурсов).
+        """
+        reservations = []
+        with self.lock:
+            for task_compute_demand, task_data_size in tasks:
+                if (self.is_down or
+                        self.current_load_flops + task_compute_demand > self.compute_power_flops or
+                        self.current_network_load_bytes + task_data_size > self.bandwidth_bytes):
+                    reservations.append(None)
+                    continue
                 self.current_load_flops += task_compute_demand
                 self.current_network_load_bytes += task_data_size
                 self.running_tasks_count += 1
-            self.task_queue.put((task_compute_demand, task_data_size, task_id))
-            self._start_processing()
-            logging.info(f"Node {self.node_id}: Task {task_id} added.")
-        else:
-            logging.warning(f"Node {self.node_id}: Cannot accept task {task_id}. Not enough resources.")
+                reservations.append(TaskReservation(self, task_compute_demand, task_data_size))
+        if any(reservations):
+            self._notify()
+        return reservations
+
+    def release(self, reservation: TaskReservation):
+        """
+        Отменяет резервирование, под которое задача так и не была запущена.
+        """
+        with self.lock:
+            self.current_load_flops -= reservation.task_compute_demand
+            self.current_network_load_bytes -= reservation.task_data_size
+            self.running_tasks_count -= 1
+        self._notify()
 
-    def _process_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+    def start_task(self, reservation: TaskReservation, task_id: str, arrival_time: float = None):
         """
-        Обрабатывает одну задачу в отдельном потоке.
+        Запускает задачу на ресурсах, зарезервированных try_reserve.
+
+        :param reservation: Резервирование этой ноды.
+        :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи (создания устройством) по часам ноды.
+                             По умолчанию - текущее время, т.е. ожидания в очереди нет.
+        """
+        dispatch_time = self.clock.now()
+        self.task_queue.put((reservation.task_compute_demand, reservation.task_data_size, task_id, dispatch_time,
+                             dispatch_time if arrival_time is None else arrival_time))
+        self._start_processing()
+        logging.debug("Node %s: Task %s added.", self.node_id, task_id)
+
+    def add_task(self, task_compute_demand: float, task_data_size: float, task_id: str) -> bool:
+        """
+        Добавляет задачу в очередь для выполнения.
+
+        :param task_compute_demand: Требуемая мощность задачи (FLOPS).
+        :param task_data_size: Объем данных задачи (байты).
+        :param task_id: Идентификатор задачи.
+        :return: True, если задача принята.
+        """
+        reservation = self.try_reserve(task_compute_demand, task_data_size)
+        if reservation is None:
+            logging.warning("Node %s: Cannot accept task %s. Not enough resources.", self.node_id, task_id)
+            return False
+        self.start_task(reservation, task_id)
+        return True
+
+    def _process_task(self, task_compute_demand: float, task_data_size: float, task_id: str, dispatch_time: float,
+                      arrival_time: float):
+        """
+        Процесс обработки одной задачи. Генератор отдает (yield) длительности этапов,
+        ожидание выполняют часы ноды: поток с time.sleep или календарь событий.
 
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
         :param task_id: Идентификатор задачи.
+        :param dispatch_time: Время передачи задачи ноде (start_task) по часам ноды.
+        :param arrival_time: Время поступления задачи по часам ноды.
         """
+        # записи по этапам задачи - DEBUG, при более высоком уровне логов проверка делается один раз на задачу
+        debug = logging.root.isEnabledFor(logging.DEBUG)
+        trace = self.trace
+
         # Симуляция времени передачи данных
         data_transfer_time = task_data_size / self.bandwidth_bytes
-        logging.info(f"Node {self.node_id}: Task {task_id} data transfer started (size={task_data_size} bytes).")
-        time.sleep(data_transfer_time)
-        logging.info(f"Node {self.node_id}: Task {task_id} data transfer completed.")
+        if debug:
+            logging.debug("Node %s: Task %s data transfer started (size=%s bytes).",
+                          self.node_id, task_id, task_data_size)
+        if trace is not None:
+            trace.record(TRANSFER_START, task_id, self.node_id, task_compute_demand, task_data_size)
+        yield data_transfer_time
+        transfer_end_time = self.clock.now()
+        if debug:
+            logging.debug("Node %s: Task %s data transfer completed.", self.node_id, task_id)
+        if trace is not None:
+            trace.record(TRANSFER_END, task_id, self.node_id, task_compute_demand, task_data_size)
 
         # Симуляция задержки до начала выполнения задачи
-        time.sleep(self.delay_seconds)
-        logging.info(f"Node {self.node_id}: Task {task_id} execution delay completed.")
+        yield self.delay_seconds
+        execution_start_time = self.clock.now()
+        if debug:
+            logging.debug("Node %s: Task %s execution delay completed.", self.node_id, task_id)
+        if trace is not None:
+            trace.record(EXECUTION_START, task_id, self.node_id, task_compute_demand, task_data_size)
 
         # Симуляция выполнения задачи
         execution_time = task_compute_demand / self.compute_power_flops
-        logging.info(
-            f"Node {self.node_id}: Task {task_id} execution started (compute demand={task_compute_demand} FLOPS).")
-        logging.info(f"Current tasks on Node {self.node_id} is {self.running_tasks_count}")
-        time.sleep(execution_time)
-
-        self.done_tasks_count += 1
-        logging.info(f"Node {self.node_id}: Task {task_id} execution completed. Total completed tasks {self.done_tasks_count}")
-
-
+        if debug:
+            logging.debug("Node %s: Task %s execution started (compute demand=%s FLOPS).",
+                          self.node_id, task_id, task_compute_demand)
+            logging.debug("Current tasks on Node %s is %s", self.node_id, self.running_tasks_count)
+        yield execution_time
 
         # Освобождение ресурсов
         with self.lock:
+            self.done_tasks_count += 1
             self.current_load_flops -= task_compute_demand
             self.current_network_load_bytes -= task_data_size
             self.running_tasks_count -= 1
-
+            self.task_latency.record(arrival_time, dispatch_time, transfer_end_time, execution_start_time,
+                                     self.clock.now())
+        self._notify()
+        if debug:
+            logging.debug("Node %s: Task %s execution completed. Total completed tasks %s",
+                          self.node_id, task_id, self.done_tasks_count)
+        if trace is not None:
+            trace.record(COMPLETE, task_id, self.node_id, task_compute_demand, task_data_size)
 
         # Сохраняем текущую загрузку после завершения задачи
         self._log_metrics()
@@ -122,37 +312,96 @@ class Node:
         """
         Запускает обработку задач из очереди.
         """
-        while not self.task_queue.empty():
-            task = self.task_queue.get()
-            thread = threading.Thread(target=self._process_task, args=task)
-            thread.start()
+        while True:
+            # get_nowait: очередь может одновременно разбирать другой поток-диспетчер
+            try:
+                task = self.task_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.clock.start_process(self._process_task(*task))
 
     def simulate_failure(self):
         """
         Симулирует отключение ноды.
         """
-        if random.random() < self.failure_probability:
-            self.is_down = True
-            logging.warning(f"Node {self.node_id}: Node failed. Downtime starts for {self.downtime_seconds} seconds.")
-            time.sleep(self.downtime_seconds)
-            self.is_down = False
-            logging.info(f"Node {self.node_id}: Node recovered after downtime.")
+        if self.rng.random() < self.failure_probability:
+            self.fail()
+            self.clock.call_later(self.downtime_seconds, self.recover)
 
-    def _log_metrics(self):
+    def fail(self):
         """
-        Сохраняет текущие метрики загрузки ноды.
+        Отключает ноду (отказ) до вызова recover.
         """
-        relative_time = time.time() - self.start_time
-        with self.lock:
+        self.is_down = True
+        self._notify()
+        logging.warning("Node %s: Node failed. Downtime starts for %s seconds.", self.node_id, self.downtime_seconds)
+        if self.trace is not None:
+            self.trace.record(NODE_FAILURE, node_id=self.node_id)
 
-            load_in_percent = (self.current_load_flops / self.compute_power_flops) * 100
-            self.load_history.append((relative_time, load_in_percent))
+    def recover(self):
+        """
+        Возвращает ноду в работу после отключения.
+        """
+        self.is_down = False
+        self._notify()
+        logging.info("Node %s: Node recovered after downtime.", self.node_id)
+        if self.trace is not None:
+            self.trace.record(NODE_RECOVERY, node_id=self.node_id)
 
-            load_network_in_percent = (self.current_network_load_bytes / self.bandwidth_bytes) * 100
-            self.network_load_history.append((relative_time, load_network_in_percent))
+    def failure_rate(self, tick_seconds: float) -> float:
+        """
+        Интенсивность отказов (отказов/сек), эквивалентная проверке simulate_failure
+        с вероятностью failure_probability каждые tick_seconds секунд.
+        """
+        if self.failure_probability <= 0:
+            return 0.0
+        if self.failure_probability >= 1:
+            return math.inf
+        return -math.log(1 - self.failure_probability) / tick_seconds
 
-            self.running_tasks_history.append((relative_time, self.running_tasks_count))
+    def start_failure_process(self, tick_seconds: float = 0.25):
+        """
+        Запускает событийную модель отказов: время до следующего отказа выбирается
+        один раз из экспоненциального распределения, восстановление планируется
+        через downtime_seconds. Отказ и восстановление - цепочка вызовов clock.call_later,
+        поэтому между событиями отказы ничего не стоят и не держат поток на ноду.
+
+        :param tick_seconds: Интервал, к которому относится failure_probability.
+        """
+        rate = self.failure_rate(tick_seconds)
+        if rate == 0:
+            return
+        self._failure_process_active = True
+        self._failure_rate = rate
+        self._schedule_failure()
+
+    def stop_failure_process(self):
+        """
+        Останавливает событийную модель отказов (цепочка оборвется на ближайшем событии).
+        """
+        self._failure_process_active = False
+
+    def _schedule_failure(self):
+        # время до следующего отказа
+        rate = self._failure_rate
+        self.clock.call_later(0.0 if math.isinf(rate) else self.rng.expovariate(rate), self._scheduled_failure)
+
+    def _scheduled_failure(self):
+        if not self._failure_process_active:
+            return
+        self.fail()
+        self.clock.call_later(self.downtime_seconds, self._scheduled_recovery)
 
+    def _scheduled_recovery(self):
+        self.recover()
+        if self._failure_process_active:
+            self._schedule_failure()
+
+    def _log_metrics(self):
+        """
+        Сохраняет текущие метрики загрузки ноды.
+        """
+        self.log_current_state(self.clock.now() - self.start_time)
 
     def log_current_state(self, relative_time: float):
         """
@@ -163,8 +412,42 @@ class Node:
         with self.lock:
             load_in_percent = (self.current_load_flops / self.compute_power_flops) * 100
             self.load_history.append((relative_time, load_in_percent))
+            self.load_average.add(relative_time, load_in_percent)
 
             load_network_in_percent = (self.current_network_load_bytes / self.bandwidth_bytes) * 100
             self.network_load_history.append((relative_time, load_network_in_percent))
+            self.network_load_average.add(relative_time, load_network_in_percent)
 
             self.running_tasks_history.append((relative_time, self.running_tasks_count))
+            self.running_tasks_average.add(relative_time, self.running_tasks_count)
+
+
+class ClusterNode(Node):
+    """
+    Нода - представление элемента ClusterState: параметры и состояние читаются и записываются
+    в массивы кластера. Обычные Node хранят их атрибутами, чтобы не платить за дескрипторы.
+    """
+    compute_power_flops = _ClusterField("compute_power_flops")
+    delay_seconds = _ClusterField("delay_seconds")
+    bandwidth_bytes = _ClusterField("bandwidth_bytes")
+    failure_probability = _ClusterField("failure_probability")
+    current_load_flops = _ClusterField("current_load_flops")
+    current_network_load_bytes = _ClusterField("current_network_load_bytes")
+    running_tasks_count = _ClusterField("running_tasks_count")
+    is_down = _ClusterField("is_down")
+
+
+_cluster_node_classes = {Node: ClusterNode}
+
+
+def cluster_node_class(cls):
+    """
+    Класс ноды-представления ClusterState для класса ноды cls. Для подклассов Node
+    создается (один раз на класс) класс Cluster<имя>, который наследует и ClusterNode,
+    и cls: поля хранятся в массивах кластера, а переопределенные методы cls сохраняются.
+    """
+    if issubclass(cls, ClusterNode):
+        return cls
+    if cls not in _cluster_node_classes:
+        _cluster_node_classes[cls] = type(f"Cluster{cls.__name__}", (ClusterNode, cls), {})
+    return _cluster_node_classes[cls]
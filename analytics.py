@@ -0,0 +1,195 @@
+import numpy as np
+
+
+def history_arrays(history):
+    """
+    Приводит историю метрики к паре массивов NumPy (times, values).
+
+    :param history: MetricsBuffer, список точек [(time, value)] или пара (times, values).
+    :return: (times, values)
+    """
+    if hasattr(history, "to_numpy"):
+        return history.to_numpy()
+    if isinstance(history, tuple) and len(history) == 2 and np.ndim(history[0]) == 1:
+        return np.asarray(history[0], dtype=np.float64), np.asarray(history[1])
+    points = np.asarray(history, dtype=np.float64).reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def time_weighted_mean(times, values, active_only: bool = False) -> float:
+    """
+    Среднее взвешенное по времени значение метрики: значение точки i действует
+    до точки i + 1, сумма value * dt делится на общую длительность.
+
+    :param times: Времена точек (по возрастанию).
+    :param values: Значения метрики.
+    :param active_only: Только по точкам с ненулевым значением (активная работа сервера).
+    :return: Среднее взвешенное или 0, если нагрузки не было.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if active_only:
+        active = values > 0
+        times, values = times[active], values[active]
+    if len(times) < 2:
+        return 0
+    total_weighted = values[:-1] @ np.diff(times)
+    if total_weighted == 0:
+        return 0
+    return float(total_weighted / (times[-1] - times[0]))
+
+
+def percentiles(values, q=(50, 95, 99)) -> np.ndarray:
+    """
+    Перцентили значений метрики по точкам истории.
+
+    :param q: Уровни перцентилей (0..100).
+    :return: Массив по элементу на уровень (nan, если точек нет).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.full(len(q), np.nan)
+    return np.percentile(values, q)
+
+
+def cumulative_load(times, values, at):
+    """
+    Интеграл ступенчатой метрики (значение точки действует до следующей точки)
+    от первой точки до моментов at.
+
+    :param at: Моменты времени (массив), значения вне [times[0], times[-1]] обрезаются.
+    :return: Массив интегралов.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    at = np.clip(np.asarray(at, dtype=np.float64), times[0], times[-1])
+    # интеграл в точках истории
+    integral = np.concatenate(([0.0], np.cumsum(values[:-1] * np.diff(times))))
+    i = np.searchsorted(times, at, side="right") - 1
+    return integral[i] + values[i] * (at - times[i])
+
+
+def interval_utilization(times, values, interval: float, start: float = None):
+    """
+    Среднее взвешенное значение метрики на каждом интервале длиной interval
+    (например, загрузка ноды по секундам симуляции).
+
+    :param interval: Длина интервала (секунды).
+    :param start: Начало первого интервала. По умолчанию - время первой точки.
+    :return: (начала интервалов, средние значения); последний интервал может быть неполным.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) < 2:
+        return np.empty(0), np.empty(0)
+    start = times[0] if start is None else start
+    edges = np.append(np.arange(start, times[-1], interval), times[-1])
+    if len(edges) < 2:
+        return np.empty(0), np.empty(0)
+    integral = cumulative_load(times, values, edges)
+    # часть интервала до первой точки истории не учитывается в его длительности
+    duration = np.diff(np.clip(edges, times[0], times[-1]))
+    means = np.divide(np.diff(integral), duration, out=np.zeros(len(duration)), where=duration > 0)
+    return edges[:-1], means
+
+
+def concat_histories(histories):
+    """
+    Склеивает несколько историй (ноды одного прогона или нескольких прогонов)
+    в общие массивы, чтобы считать метрики по всем историям сразу.
+
+    :param histories: Истории (см. history_arrays).
+    :return: (times, values, offsets) - точки истории k: offsets[k]:offsets[k + 1].
+    """
+    columns = [history_arrays(history) for history in histories]
+    lengths = [len(times) for times, _ in columns]
+    offsets = np.zeros(len(columns) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if not columns:
+        return np.empty(0), np.empty(0), offsets
+    times = np.concatenate([times for times, _ in columns]).astype(np.float64, copy=False)
+    values = np.concatenate([values for _, values in columns]).astype(np.float64, copy=False)
+    return times, values, offsets
+
+
+def _segment_sums(x, offsets):
+    sums = np.zeros(len(offsets) - 1)
+    starts = offsets[:-1]
+    nonempty = offsets[1:] > starts
+    if nonempty.any():
+        # сегменты идут подряд, поэтому пустые сегменты между индексами ничего не добавляют
+        sums[nonempty] = np.add.reduceat(x, starts[nonempty])
+    return sums
+
+
+def time_weighted_means(times, values, offsets, active_only: bool = False) -> np.ndarray:
+    """
+    time_weighted_mean для каждой истории из concat_histories одним проходом по массивам.
+
+    :return: Массив средних, по элементу на историю.
+    """
+    if active_only:
+        active = values > 0
+        counts = _segment_sums(active.astype(np.float64), offsets).astype(np.int64)
+        offsets = np.zeros_like(offsets)
+        np.cumsum(counts, out=offsets[1:])
+        times, values = times[active], values[active]
+
+    means = np.zeros(len(offsets) - 1)
+    if len(times) < 2:
+        return means
+    # вклад точки i - value * dt до следующей точки той же истории
+    weighted = np.zeros(len(times))
+    weighted[:-1] = values[:-1] * np.diff(times)
+    ends = offsets[1:]
+    weighted[ends[ends > 0] - 1] = 0
+
+    total_weighted = _segment_sums(weighted, offsets)
+    has_points = ends - offsets[:-1] >= 2
+    total_time = np.zeros(len(means))
+    total_time[has_points] = times[ends[has_points] - 1] - times[offsets[:-1][has_points]]
+    nonzero = total_weighted != 0
+    means[nonzero] = total_weighted[nonzero] / total_time[nonzero]
+    return means
+
+
+def segment_percentiles(values, offsets, q=(50, 95, 99)) -> np.ndarray:
+    """
+    percentiles для каждой истории из concat_histories: одна сортировка всех точек
+    и линейная интерполяция, как в np.percentile.
+
+    :return: Массив (историй x уровней), nan для пустых историй.
+    """
+    q = np.asarray(q, dtype=np.float64)
+    lengths = np.diff(offsets)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    ordered = values[np.lexsort((values, segment))]
+
+    result = np.full((len(lengths), len(q)), np.nan)
+    nonempty = lengths > 0
+    starts = offsets[:-1][nonempty, None]
+    position = (lengths[nonempty, None] - 1) * q / 100
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    low_values = ordered[starts + lower]
+    result[nonempty] = low_values + (ordered[starts + upper] - low_values) * (position - lower)
+    return result
+
+
+def summarize_histories(histories, q=(50, 95, 99)) -> dict:
+    """
+    Сводка по набору историй одной метрики (например, load_history всех нод
+    одного или нескольких прогонов).
+
+    :return: Словарь массивов по элементу на историю: "mean" (среднее по точкам),
+             "weighted_mean", "active_weighted_mean" и "percentiles" (историй x уровней).
+    """
+    times, values, offsets = concat_histories(histories)
+    lengths = np.diff(offsets)
+    sums = _segment_sums(values, offsets)
+    mean = np.divide(sums, lengths, out=np.full(len(lengths), np.nan), where=lengths > 0)
+    return {
+        "mean": mean,
+        "weighted_mean": time_weighted_means(times, values, offsets),
+        "active_weighted_mean": time_weighted_means(times, values, offsets, active_only=True),
+        "percentiles": segment_percentiles(values, offsets, q),
+    }
@@ -0,0 +1,155 @@
+import logging
+import logging.handlers
+import marshal
+import queue
+import struct
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в вызывающем потоке: запись уходит в очередь
+    как есть, сообщение собирается обработчиками в потоке QueueListener.
+    Аргументы записей симуляции - числа и строки, поэтому отложенное форматирование безопасно.
+    """
+    def prepare(self, record):
+        return record
+
+
+class BinaryLogHandler(logging.Handler):
+    # заголовок записи: время, уровень, номер шаблона сообщения, длина аргументов
+    RECORD = struct.Struct("<dBII")
+    # уровень служебной записи с текстом нового шаблона; уровни обычных записей
+    # ограничиваются MAX_LEVEL, поэтому записи с любым уровнем (в том числе NOTSET) не путаются с шаблонами
+    TEMPLATE_LEVEL = 255
+    MAX_LEVEL = 254
+    # типы аргументов, которые сохраняются как есть; остальные (np.float64, Enum, ...) - строками,
+    # чтобы при чтении не зависеть от модулей симуляции
+    PLAIN_TYPES = (int, float, str, bytes, type(None))
+
+    def __init__(self, filename: str):
+        """
+        Компактный бинарный журнал: вместо готового текста пишутся номер шаблона сообщения
+        (текст шаблона - один раз) и аргументы в формате marshal. Текст собирается только
+        при чтении (read_binary_log).
+
+        :param filename: Имя файла журнала.
+        """
+        super().__init__()
+        self.file = open(filename, "wb")
+        self.templates = {}     # шаблон сообщения -> номер
+
+    def emit(self, record):
+        try:
+            template = str(record.msg)
+            args = record.args or ()
+            if record.exc_info:
+                template += "\n%s"
+                args = tuple(args) + (logging.Formatter().formatException(record.exc_info),)
+
+            template_id = self.templates.get(template)
+            if template_id is None:
+                template_id = self.templates[template] = len(self.templates)
+                text = template.encode()
+                self.file.write(self.RECORD.pack(record.created, self.TEMPLATE_LEVEL, template_id, len(text)) + text)
+
+            if isinstance(args, dict):
+                args = {key: self._plain(value) for key, value in args.items()}
+            else:
+                args = tuple(map(self._plain, args))
+            payload = marshal.dumps(args)
+            levelno = min(record.levelno, self.MAX_LEVEL)
+            self.file.write(self.RECORD.pack(record.created, levelno, template_id, len(payload)) + payload)
+        except Exception:
+            self.handleError(record)
+
+    @classmethod
+    def _plain(cls, value):
+        # точная проверка типа: подклассы int/float/str (bool, np.float64) marshal
+        # сохраняет как базовый тип или не сохраняет вовсе
+        return value if type(value) in cls.PLAIN_TYPES else str(value)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def read_binary_log(filename: str):
+    """
+    Читает журнал BinaryLogHandler.
+
+    :return: Генератор (время, уровень, текст сообщения).
+    """
+    templates = {}
+    header_size = BinaryLogHandler.RECORD.size
+    with open(filename, "rb") as file:
+        while True:
+            header = file.read(header_size)
+            if len(header) < header_size:
+                return
+            created, levelno, template_id, size = BinaryLogHandler.RECORD.unpack(header)
+            data = file.read(size)
+            if levelno == BinaryLogHandler.TEMPLATE_LEVEL:
+                templates[template_id] = data.decode()
+                continue
+            args = marshal.loads(data)
+            template = templates[template_id]
+            yield created, levelno, template % args if args else template
+
+
+def setup_logging(filename: str = "simulation.log", level: int = logging.INFO, binary_filename: str = None,
+                  queued: bool = True):
+    """
+    Настраивает корневой логгер. Записи уходят в очередь, а форматирует и пишет их фоновый
+    поток QueueListener, поэтому в потоках симуляции логирование стоит одну постановку в очередь.
+
+    :param filename: Текстовый журнал. None - без текстового файла.
+    :param level: Уровень логирования. Записи ниже уровня отбрасываются до создания.
+    :param binary_filename: Бинарный журнал (BinaryLogHandler). None - не писать.
+    :param queued: False - писать журналы прямо в потоке записи, без очереди.
+    :return: QueueListener (для stop_logging) или None.
+    """
+    handlers = []
+    if filename is not None:
+        handlers.append(logging.FileHandler(filename, mode="w"))
+    if binary_filename is not None:
+        handlers.append(BinaryLogHandler(binary_filename))
+    if not handlers:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not queued:
+        for handler in handlers:
+            root.addHandler(handler)
+        return None
+
+    listener = logging.handlers.QueueListener(queue.SimpleQueue(), *handlers)
+    root.addHandler(DeferredQueueHandler(listener.queue))
+    listener.start()
+    return listener
+
+
+def stop_logging(listener):
+    """
+    Дописывает записи из очереди и закрывает журналы, настроенные setup_logging.
+    """
+    root = logging.getLogger()
+    if listener is None:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        return
+
+    listener.stop()
+    for handler in list(root.handlers):
+        if isinstance(handler, DeferredQueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,76 @@
+"""
+Проверка корректности ConcurrentDispatcher под нагрузкой: несколько потоков-диспетчеров
+одновременно распределяют задачи, после чего проверяется, что каждая задача либо принята нодой,
+либо учтена как отклоненная (lost = 0), и что ни одна нода не зарезервирована сверх своей
+мощности и пропускной способности сети (overbooked = 0). При нарушении - код возврата 1.
+
+Скорость здесь не измеряется: из-за GIL диспетчеры не ускоряют распределение
+(см. ConcurrentDispatcher), стоимость решения - в benchmarks/distributor_bench.py.
+
+Задачи занимают ноды дольше, чем идет проверка, поэтому часть задач гарантированно отклоняется.
+
+Запуск из корня проекта:
+    python -m benchmarks.concurrent_dispatch --nodes 1000 --tasks 50000 --dispatchers 1 2 4 8
+"""
+import argparse
+import logging
+import sys
+
+from dispatcher import ConcurrentDispatcher
+from Node import Node
+from simulation_clock import TimerHeapClock
+from task_distributor import RoundRobin, WeightedRoundRobin, LeastConnection, WeightedLeastConnection
+
+DISTRIBUTORS = {
+    "RR": RoundRobin,
+    "WRR": WeightedRoundRobin,
+    "LC": LeastConnection,
+    "WLC": WeightedLeastConnection,
+}
+
+
+def run(distributor_class, nodes_count, tasks_count, dispatchers_count):
+    clock = TimerHeapClock()
+    # задержка перед выполнением 1000 сек: за время проверки ни одна задача не освобождает ноду
+    nodes = [Node(node_id=i + 1, compute_power_flops=1000 + i % 7 * 100, delay_seconds=1000,
+                  bandwidth_bytes=100, failure_probability=0, downtime_seconds=4, clock=clock)
+             for i in range(nodes_count)]
+    dispatcher = ConcurrentDispatcher(distributor_class(nodes), dispatchers_count)
+
+    for i in range(tasks_count):
+        dispatcher.distribute_task(100 + i % 5 * 100, 1, f"T{i}")
+    dispatcher.stop()
+    clock.stop()
+
+    accepted = sum(node.get_current_tasks_on_node() for node in nodes)
+    overbooked = sum(node.current_load_flops > node.compute_power_flops or
+                     node.current_network_load_bytes > node.bandwidth_bytes for node in nodes)
+    return accepted, dispatcher.rejected_tasks, overbooked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", default=list(DISTRIBUTORS), choices=list(DISTRIBUTORS))
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--dispatchers", nargs="+", type=int, default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    failed = False
+    print(f"{'algorithm':<12}{'dispatchers':>12}{'accepted':>10}{'rejected':>10}{'lost':>6}{'overbooked':>12}")
+    for algorithm in args.algorithms:
+        for dispatchers_count in args.dispatchers:
+            accepted, rejected, overbooked = run(DISTRIBUTORS[algorithm], args.nodes, args.tasks, dispatchers_count)
+            lost = args.tasks - accepted - rejected
+            failed = failed or lost != 0 or overbooked != 0
+            print(f"{algorithm:<12}{dispatchers_count:>12}{accepted:>10}{rejected:>10}{lost:>6}{overbooked:>12}")
+
+    if failed:
+        print("Есть потерянные задачи или ноды с превышением ресурсов")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Стоимость одного решения distribute_task у RoundRobin, WeightedRoundRobin, LeastConnection
+и WeightedLeastConnection в зависимости от размера кластера и его загрузки.
+
+Ноды - заглушки: задача, отданная ноде, сразу освобождает ресурсы, поэтому состояние
+кластера во время замера не меняется:
+    empty     - ноды свободны, подходит первая же нода;
+    half      - каждая нода загружена наполовину (мощность и сеть);
+    saturated - свободной мощности нет, каждая задача отклоняется после полного поиска.
+
+Замер как в timeit: количество вызовов подбирается автоматически (Timer.autorange),
+время решения - медиана из --repeat повторов; p50/p99 - по отдельным вызовам.
+
+Абсолютное время зависит от машины, поэтому с эталоном сравнивается относительное время:
+время решения, деленное на время калибровочного цикла на чистом Python (CALIBRATION).
+Калибровочный цикл замеряется перед каждым повтором, так что замедление всей машины
+во время запуска сокращается; относительное время - медиана отношений по повторам,
+шум - их разброс (max / min - 1). Замедлением считается отношение к эталону больше
+1 + threshold + шум замера и эталона. Эталон benchmarks/distributor_baseline.json снят
+на другой машине и служит только примером формата: перед сравнением его нужно пересоздать
+локально (--save-baseline) на неизмененном коде.
+
+Запуск из корня проекта:
+    python -m benchmarks.distributor_bench --save-baseline benchmarks/distributor_baseline.json
+    python -m benchmarks.distributor_bench --baseline benchmarks/distributor_baseline.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import statistics
+import sys
+import time
+import timeit
+
+from latency import LatencyHistogram
+from Node import Node
+from simulation_clock import VirtualClock
+from task_distributor import RoundRobin, WeightedRoundRobin, LeastConnection, WeightedLeastConnection
+
+DISTRIBUTORS = {
+    "RR": RoundRobin,
+    "WRR": WeightedRoundRobin,
+    "LC": LeastConnection,
+    "WLC": WeightedLeastConnection,
+}
+STATES = ("empty", "half", "saturated")
+
+# задачи замера: требуемая мощность (FLOPS) и объем данных (байты)
+TASKS = [(100 + i % 5 * 100, 10 + i % 3 * 10, f"T{i}") for i in range(1000)]
+
+
+class StubNode(Node):
+    """
+    Нода без выполнения задач: резервирование, полученное от дистрибьютора, сразу
+    освобождается (с уведомлением индексов дистрибьютора, как при завершении задачи).
+    """
+    def start_task(self, reservation, task_id: str, arrival_time: float = None):
+        self.release(reservation)
+
+
+def create_cluster(nodes_count: int, state: str) -> list:
+    clock = VirtualClock()
+    nodes = [StubNode(node_id=i + 1, compute_power_flops=1000 + i % 7 * 100, delay_seconds=0.1,
+                      bandwidth_bytes=1000 + i % 5 * 100, failure_probability=0, downtime_seconds=1, clock=clock)
+             for i in range(nodes_count)]
+    for node in nodes:
+        if state == "half":
+            node.try_reserve(node.compute_power_flops / 2, node.bandwidth_bytes / 2)
+        elif state == "saturated":
+            node.try_reserve(node.compute_power_flops, 0)
+    return nodes
+
+
+# калибровочный цикл на чистом Python - единица относительного времени
+CALIBRATION = timeit.Timer(lambda: sum(i * i for i in range(1000)))
+
+
+def measure(distributor_class, nodes_count: int, state: str, repeat: int, calibration_number: int) -> dict:
+    """
+    Замер одного сочетания алгоритм / размер кластера / загрузка.
+
+    :param calibration_number: Количество прогонов калибровочного цикла перед каждым повтором.
+    :return: Словарь с временем решения (мкс), относительным временем и его шумом,
+             пропускной способностью (решений/сек).
+    """
+    # дистрибьютор создается после загрузки нод: индексы строятся по текущему состоянию
+    distributor = distributor_class(create_cluster(nodes_count, state))
+    tasks = itertools.cycle(TASKS)
+    distribute_task = distributor.distribute_task
+
+    timer = timeit.Timer(lambda: distribute_task(*next(tasks)))
+    number, _ = timer.autorange()
+    timings = []
+    relative = []
+    for _ in range(repeat):
+        calibration = CALIBRATION.timeit(calibration_number) / calibration_number
+        timings.append(timer.timeit(number) / number)
+        relative.append(timings[-1] / calibration)
+    median = statistics.median(timings)
+
+    # распределение времени отдельных решений
+    histogram = LatencyHistogram(min_value=1e-8)
+    for _ in range(min(number, 10000)):
+        task = next(tasks)
+        start = time.perf_counter()
+        distribute_task(*task)
+        histogram.record(time.perf_counter() - start)
+    p50, p99 = histogram.percentiles((50, 99))
+
+    return {
+        "us_per_decision": median * 1e6,
+        "relative": statistics.median(relative),
+        "noise": max(relative) / min(relative) - 1,
+        "decisions_per_sec": 1 / median,
+        "p50_us": p50 * 1e6,
+        "p99_us": p99 * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", default=list(DISTRIBUTORS), choices=list(DISTRIBUTORS))
+    parser.add_argument("--nodes", nargs="+", type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument("--states", nargs="+", default=list(STATES), choices=STATES)
+    parser.add_argument("--repeat", type=int, default=5, help="количество повторов замера")
+    parser.add_argument("--save-baseline", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с эталонными результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="допустимое замедление относительно эталона сверх шума замеров (0.3 = 30%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    calibration_number, _ = CALIBRATION.autorange()
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<24}{'us/decision':>12}{'decisions/s':>13}{'p50 us':>10}{'p99 us':>10}{'vs base':>9}")
+    for algorithm, nodes_count, state in itertools.product(args.algorithms, args.nodes, args.states):
+        name = f"{algorithm}/{nodes_count}/{state}"
+        result = measure(DISTRIBUTORS[algorithm], nodes_count, state, args.repeat, calibration_number)
+        results[name] = result
+
+        change = ""
+        if name in baseline:
+            ratio = result["relative"] / baseline[name]["relative"]
+            change = f"{ratio:.2f}x"
+            # шум обоих замеров расширяет допуск: разброс повторов больше порога - не регрессия
+            tolerance = args.threshold + result["noise"] + baseline[name].get("noise", 0)
+            if ratio > 1 + tolerance:
+                change += " !"
+                regressions.append((name, ratio, tolerance))
+        print(f"{name:<24}{result['us_per_decision']:>12.2f}{result['decisions_per_sec']:>13.0f}"
+              f"{result['p50_us']:>10.2f}{result['p99_us']:>10.2f}{change:>9}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat,
+                       "results": results}, file, indent=2)
+        print(f"Результаты сохранены в файл: {args.save_baseline}")
+
+    if regressions:
+        print(f"Замедление относительно эталона больше допуска ({args.threshold:.0%} + шум замеров):")
+        for name, ratio, tolerance in regressions:
+            print(f"  {name}: {ratio:.2f}x (допуск {1 + tolerance:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
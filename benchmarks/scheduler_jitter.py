@@ -0,0 +1,75 @@
+"""
+Сравнение модели "поток на задачу" (RealTimeClock) и одного потока-планировщика
+на min-heap (TimerHeapClock): число потоков и опоздание пробуждения этапов задач.
+
+Запуск из корня проекта:
+    python -m benchmarks.scheduler_jitter --tasks 2000
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from simulation_clock import RealTimeClock, TimerHeapClock
+
+
+def task_process(lateness, phases):
+    """
+    Процесс задачи из нескольких этапов (передача, задержка, выполнение).
+    Для каждого этапа записывается опоздание пробуждения относительно плана.
+    """
+    for delay in phases:
+        expected = time.time() + delay
+        yield delay
+        lateness.append(time.time() - expected)
+
+
+def run_model(clock, tasks, arrival_window, rng):
+    lateness = []
+    peak_threads = threading.active_count()
+    start = time.time()
+
+    for _ in range(tasks):
+        phases = (rng.uniform(0.01, 0.1), 0.1, rng.uniform(0.05, 0.5))
+        clock.start_process(task_process(lateness, phases))
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(arrival_window / tasks)
+
+    # ждем завершения всех этапов
+    while len(lateness) < tasks * 3:
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.01)
+
+    return {
+        "peak_threads": peak_threads,
+        "duration": time.time() - start,
+        "mean_ms": statistics.mean(lateness) * 1000,
+        "p99_ms": sorted(lateness)[int(len(lateness) * 0.99) - 1] * 1000,
+        "max_ms": max(lateness) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=2000, help="количество задач")
+    parser.add_argument("--window", type=float, default=2.0, help="интервал поступления задач (сек)")
+    parser.add_argument("--workers", type=int, default=0, help="размер пула TimerHeapClock")
+    args = parser.parse_args()
+
+    models = [
+        ("thread per task", RealTimeClock()),
+        (f"timer heap (workers={args.workers})", TimerHeapClock(workers=args.workers)),
+    ]
+
+    print(f"{'model':<28}{'peak threads':>14}{'mean ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, clock in models:
+        result = run_model(clock, args.tasks, args.window, random.Random(1))
+        print(f"{name:<28}{result['peak_threads']:>14}{result['mean_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['max_ms']:>10.2f}")
+        if isinstance(clock, TimerHeapClock):
+            clock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Сравнение равномерности распределения нагрузки WeightedRoundRobin и SmoothWeightedRoundRobin:
+дисперсия средней взвешенной по времени загрузки нод (%) на эталонной конфигурации main.py.
+
+Запуск из корня проекта:
+    python -m benchmarks.wrr_variance --seeds 1 2 3 4 5 --duration 60 --load-scale 0.3
+"""
+import argparse
+import logging
+import statistics
+
+import numpy as np
+
+from analytics import history_arrays, time_weighted_mean
+from main import NODES_CONFIG, DEVICES_CONFIG, create_nodes, create_devices, run_virtual_simulation
+from random_streams import SeedStream
+from simulation_clock import VirtualClock
+from task_distributor import WeightedRoundRobin, SmoothWeightedRoundRobin
+
+
+def time_weighted_load(history, duration):
+    """
+    Средняя взвешенная по времени загрузка по истории [(time, value)] на интервале [0, duration]:
+    история дополняется нулевыми точками в 0 и duration, точки после duration отбрасываются.
+    """
+    times, values = history_arrays(history)
+    inside = times < duration
+    return time_weighted_mean(np.concatenate(([0.0], times[inside], [duration])),
+                              np.concatenate(([0.0], values[inside], [0.0])))
+
+
+def run(distributor_class, seed, duration, load_scale, failures):
+    nodes_config = [dict(params, failure_probability=params["failure_probability"] if failures else 0)
+                    for params in NODES_CONFIG]
+    devices_config = [dict(params, task_generation_frequency=params["task_generation_frequency"] * load_scale)
+                      for params in DEVICES_CONFIG]
+
+    nodes_seed_stream, devices_seed_stream = SeedStream(seed).spawn(2)
+    clock = VirtualClock()
+    nodes = create_nodes(nodes_config, clock, nodes_seed_stream)
+    devices = create_devices(devices_config, clock, devices_seed_stream)
+    distributor = distributor_class(nodes)
+    created = run_virtual_simulation(nodes, devices, distributor, duration, clock)
+    loads = [time_weighted_load(node.load_history, duration) for node in nodes]
+    return loads, created, distributor.rejected_tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3, 4, 5])
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--load-scale", type=float, default=0.3, help="множитель частоты генерации задач")
+    parser.add_argument("--failures", action="store_true", help="включить отказы нод")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'algorithm':<28}{'seed':>6}{'mean load %':>14}{'variance':>12}{'rejected %':>12}")
+    for distributor_class in (WeightedRoundRobin, SmoothWeightedRoundRobin):
+        variances = []
+        for seed in args.seeds:
+            loads, created, rejected = run(distributor_class, seed, args.duration, args.load_scale, args.failures)
+            variances.append(statistics.pvariance(loads))
+            print(f"{distributor_class.__name__:<28}{seed:>6}{statistics.mean(loads):>14.2f}"
+                  f"{variances[-1]:>12.2f}{rejected / created * 100:>12.2f}")
+        print(f"{distributor_class.__name__:<28}{'mean':>6}{'':>14}{statistics.mean(variances):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import heapq
+import math
+import threading
+
+
+class IndexedMinHeap:
+    def __init__(self, keys: list):
+        """
+        Индексированная min-heap: элемент i (номер ноды) имеет ключ keys[i],
+        ключ любого элемента можно изменить за O(log n).
+        При равных ключах меньше тот элемент, у которого меньше номер.
+
+        :param keys: Начальные ключи элементов 0..n-1.
+        """
+        self.keys = list(keys)
+        self.heap = sorted(range(len(self.keys)), key=lambda i: (self.keys[i], i))
+        self.positions = [0] * len(self.keys)
+        for position, i in enumerate(self.heap):
+            self.positions[i] = position
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _less(self, a: int, b: int) -> bool:
+        key_a, key_b = self.keys[a], self.keys[b]
+        return key_a < key_b or (key_a == key_b and a < b)
+
+    def _swap(self, p: int, q: int):
+        heap = self.heap
+        heap[p], heap[q] = heap[q], heap[p]
+        self.positions[heap[p]] = p
+        self.positions[heap[q]] = q
+
+    def _sift_up(self, p: int):
+        heap = self.heap
+        while p > 0:
+            parent = (p - 1) // 2
+            if not self._less(heap[p], heap[parent]):
+                break
+            self._swap(p, parent)
+            p = parent
+
+    def _sift_down(self, p: int):
+        heap = self.heap
+        n = len(heap)
+        while True:
+            smallest = p
+            left, right = 2 * p + 1, 2 * p + 2
+            if left < n and self._less(heap[left], heap[smallest]):
+                smallest = left
+            if right < n and self._less(heap[right], heap[smallest]):
+                smallest = right
+            if smallest == p:
+                return
+            self._swap(p, smallest)
+            p = smallest
+
+    def update(self, i: int, key):
+        """
+        Изменяет ключ элемента i.
+        """
+        with self.lock:
+            self._set_key(i, key)
+
+    def update_with(self, i: int, key_fn):
+        """
+        Изменяет ключ элемента i на key_fn(). Ключ вычисляется под блокировкой кучи,
+        поэтому при одновременных обновлениях одного элемента в куче остается
+        ключ, вычисленный последним.
+        """
+        with self.lock:
+            self._set_key(i, key_fn())
+
+    def _set_key(self, i: int, key):
+        old_key = self.keys[i]
+        self.keys[i] = key
+        if key < old_key:
+            self._sift_up(self.positions[i])
+        elif key > old_key:
+            self._sift_down(self.positions[i])
+
+    def find_min(self, accept=None, limit=math.inf):
+        """
+        Находит элемент с минимальным ключом, для которого accept(i) == True.
+        Обход идет по дереву кучи в порядке возрастания ключей, поэтому проверяются
+        только элементы, ключ которых меньше ответа: O(k log k), где k - количество
+        отвергнутых элементов.
+
+        :param accept: Функция проверки элемента (по умолчанию подходит любой).
+        :param limit: Элементы с ключом >= limit не рассматриваются.
+        :return: Номер элемента или None.
+        """
+        with self.lock:
+            heap = self.heap
+            keys = self.keys
+            if not heap:
+                return None
+            candidates = [(keys[heap[0]], heap[0], 0)]
+            while candidates:
+                key, i, position = heapq.heappop(candidates)
+                if key >= limit:
+                    return None
+                if accept is None or accept(i):
+                    return i
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(heap):
+                        heapq.heappush(candidates, (keys[heap[child]], heap[child], child))
+            return None
+
+
+class CapacityIndex:
+    def __init__(self, nodes: list, order: list = None):
+        """
+        Индекс свободных ресурсов кластера: дерево отрезков с максимумами свободной
+        мощности (FLOPS) и свободной пропускной способности (байты/сек).
+        Отвечает, какие ноды могут принять задачу, без обхода всех нод и без их блокировок.
+        Ноды обновляют индекс за O(log n) при изменении загрузки или доступности.
+
+        :param nodes: Список нод.
+        :param order: Порядок нод в индексе (список номеров нод). find_first возвращает
+                      первую подходящую ноду в этом порядке. По умолчанию - порядок списка.
+                      Нода может встречаться в порядке несколько раз (слоты расписания).
+        """
+        self.nodes = nodes
+        self.order = list(order) if order is not None else list(range(len(nodes)))
+        self.positions = {}     # нода -> ее позиции в индексе
+        for position, i in enumerate(self.order):
+            self.positions.setdefault(nodes[i], []).append(position)
+
+        self.size = 1
+        while self.size < len(self.order):
+            self.size *= 2
+        self.free_flops = [-math.inf] * (2 * self.size)
+        self.free_bandwidth = [-math.inf] * (2 * self.size)
+        self.lock = threading.Lock()
+
+        for position, i in enumerate(self.order):
+            self.free_flops[self.size + position], self.free_bandwidth[self.size + position] = \
+                self.free_resources(nodes[i])
+        for v in range(self.size - 1, 0, -1):
+            self.free_flops[v] = max(self.free_flops[2 * v], self.free_flops[2 * v + 1])
+            self.free_bandwidth[v] = max(self.free_bandwidth[2 * v], self.free_bandwidth[2 * v + 1])
+
+    @staticmethod
+    def free_resources(node):
+        """
+        Свободные ресурсы ноды, у недоступной ноды - минус бесконечность.
+        """
+        if not node.is_available():
+            return -math.inf, -math.inf
+        return (node.compute_power_flops - node.current_load_flops,
+                node.bandwidth_bytes - node.current_network_load_bytes)
+
+    def update(self, node):
+        """
+        Обновляет свободные ресурсы ноды в индексе. Подходит как callback для Node.subscribe.
+        """
+        with self.lock:
+            # ресурсы читаются под блокировкой индекса: при одновременных уведомлениях
+            # в индекс не попадет устаревшее значение, прочитанное раньше более свежего
+            free_flops, free_bandwidth = self.free_resources(node)
+            for position in self.positions[node]:
+                v = self.size + position
+                self.free_flops[v] = free_flops
+                self.free_bandwidth[v] = free_bandwidth
+                v //= 2
+                while v:
+                    self.free_flops[v] = max(self.free_flops[2 * v], self.free_flops[2 * v + 1])
+                    self.free_bandwidth[v] = max(self.free_bandwidth[2 * v], self.free_bandwidth[2 * v + 1])
+                    v //= 2
+
+    def fits(self, i: int, task_compute_demand: float, task_data_size: float) -> bool:
+        """
+        Может ли нода i принять задачу (по данным индекса, без блокировки ноды).
+        """
+        v = self.size + self.positions[self.nodes[i]][0]
+        return self.free_flops[v] >= task_compute_demand and self.free_bandwidth[v] >= task_data_size
+
+    def _search(self, task_compute_demand, task_data_size, lo, hi, first_only, exclude=()):
+        """
+        Обход дерева слева направо по позициям [lo, hi); поддеревья, в которых ни у одной
+        ноды не хватает мощности или пропускной способности, отбрасываются целиком.
+
+        :return: Список подходящих позиций индекса.
+        """
+        free_flops, free_bandwidth = self.free_flops, self.free_bandwidth
+        found = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            v, left, right = stack.pop()
+            if right <= lo or left >= hi:
+                continue
+            if free_flops[v] < task_compute_demand or free_bandwidth[v] < task_data_size:
+                continue
+            if right - left == 1:
+                if self.order[left] in exclude:
+                    continue
+                found.append(left)
+                if first_only:
+                    break
+                continue
+            middle = (left + right) // 2
+            stack.append((2 * v + 1, middle, right))
+            stack.append((2 * v, left, middle))
+        return found
+
+    def find_first(self, task_compute_demand: float, task_data_size: float, start: int = 0, exclude=()):
+        """
+        Первая в порядке индекса нода, которая может принять задачу, начиная с позиции start
+        (с переходом через конец списка).
+
+        :param exclude: Номера нод, которые не рассматриваются.
+        :return: Номер ноды или None.
+        """
+        position = self.find_first_position(task_compute_demand, task_data_size, start, exclude)
+        return self.order[position] if position is not None else None
+
+    def find_first_position(self, task_compute_demand: float, task_data_size: float, start: int = 0,
+                            exclude=()):
+        """
+        То же, что find_first, но возвращает позицию найденной ноды в порядке индекса
+        (например, слот расписания), а не номер ноды.
+
+        :return: Позиция или None.
+        """
+        with self.lock:
+            found = self._search(task_compute_demand, task_data_size, start, len(self.order), True, exclude)
+            if not found and start > 0:
+                found = self._search(task_compute_demand, task_data_size, 0, start, True, exclude)
+        return found[0] if found else None
+
+    def feasible_nodes(self, task_compute_demand: float, task_data_size: float) -> list:
+        """
+        Номера всех нод, которые могут принять задачу, в порядке индекса.
+        """
+        with self.lock:
+            positions = self._search(task_compute_demand, task_data_size, 0, len(self.order), False)
+        return [self.order[position] for position in positions]
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class ClusterState:
+    # массивы состояния: имя атрибута Node -> тип элементов
+    FIELDS = {
+        "compute_power_flops": np.float64,
+        "delay_seconds": np.float64,
+        "bandwidth_bytes": np.float64,
+        "failure_probability": np.float64,
+        "current_load_flops": np.float64,
+        "current_network_load_bytes": np.float64,
+        "running_tasks_count": np.int64,
+        "is_down": np.bool_,
+    }
+
+    def __init__(self, nodes: list):
+        """
+        Состояние кластера в виде массивов NumPy (struct of arrays): мощность, пропускная
+        способность, задержка, вероятность отказа, текущая загрузка, количество задач и
+        признак отключения - по одному элементу на ноду. Ноды становятся представлениями
+        своего элемента (Node.attach_cluster), поэтому дистрибьюторы могут выбирать ноду
+        одним векторным выражением по всему кластеру.
+
+        Массивы читаются без блокировок нод: результат выбора - подсказка,
+        окончательную проверку делает Node.try_reserve.
+
+        :param nodes: Список нод, элемент i массивов соответствует nodes[i].
+        """
+        self.nodes = list(nodes)
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(len(self.nodes), dtype=dtype))
+        for i, node in enumerate(self.nodes):
+            node.attach_cluster(self, i)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def feasible(self, task_compute_demand: float, task_data_size: float, exclude=()) -> np.ndarray:
+        """
+        Маска нод, которые могут принять задачу: нода доступна, и свободных мощности
+        и пропускной способности хватает.
+
+        :param exclude: Номера нод, которые не рассматриваются.
+        """
+        mask = ~self.is_down
+        mask &= self.compute_power_flops - self.current_load_flops >= task_compute_demand
+        mask &= self.bandwidth_bytes - self.current_network_load_bytes >= task_data_size
+        if exclude:
+            mask[list(exclude)] = False
+        return mask
+
+    def fits(self, i: int, task_compute_demand: float, task_data_size: float) -> bool:
+        """
+        Может ли нода i принять задачу.
+        """
+        return bool(not self.is_down[i] and
+                    self.compute_power_flops[i] - self.current_load_flops[i] >= task_compute_demand and
+                    self.bandwidth_bytes[i] - self.current_network_load_bytes[i] >= task_data_size)
+
+    def first_feasible(self, task_compute_demand: float, task_data_size: float, start: int = 0,
+                       order: np.ndarray = None, exclude=()):
+        """
+        Первая в порядке order нода, которая может принять задачу, начиная с позиции start
+        (с переходом через конец списка).
+
+        :param order: Порядок обхода (массив номеров нод). По умолчанию - порядок нод.
+        :param exclude: Номера нод, которые не рассматриваются.
+        :return: Номер ноды или None.
+        """
+        position = self.first_feasible_position(task_compute_demand, task_data_size, start, order, exclude)
+        if position is None:
+            return None
+        return int(order[position]) if order is not None else position
+
+    def first_feasible_position(self, task_compute_demand: float, task_data_size: float, start: int = 0,
+                                order: np.ndarray = None, exclude=()):
+        """
+        То же, что first_feasible, но возвращает позицию найденной ноды в order
+        (нода может встречаться в order несколько раз, например в расписании).
+
+        :return: Позиция или None.
+        """
+        mask = self.feasible(task_compute_demand, task_data_size, exclude)
+        if order is not None:
+            mask = mask[order]
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            return None
+        k = np.searchsorted(positions, start)
+        return int(positions[k] if k < len(positions) else positions[0])
+
+    def argmin_feasible(self, keys: np.ndarray, task_compute_demand: float, task_data_size: float, exclude=()):
+        """
+        Нода с минимальным ключом среди нод, которые могут принять задачу
+        (при равенстве - первая по порядку).
+
+        :param keys: Ключи нод (массив, по элементу на ноду).
+        :param exclude: Номера нод, которые не рассматриваются.
+        :return: Номер ноды или None.
+        """
+        mask = self.feasible(task_compute_demand, task_data_size, exclude)
+        if not mask.any():
+            return None
+        return int(np.argmin(np.where(mask, keys, np.inf)))
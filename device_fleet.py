@@ -0,0 +1,116 @@
+import numpy as np
+
+from random_streams import SeedStream
+
+
+class TaskBatch:
+    def __init__(self, arrival_times, device_indices, device_ids, compute_demands, data_sizes, task_numbers):
+        """
+        Пакет задач за окно времени, хранится массивами NumPy (по одному элементу на задачу),
+        отсортирован по времени поступления.
+
+        :param arrival_times: Время поступления задач.
+        :param device_indices: Индекс устройства в DeviceFleet.
+        :param device_ids: Номер устройства.
+        :param compute_demands: Требуемая мощность задач (FLOPS).
+        :param data_sizes: Объем данных задач (байты).
+        :param task_numbers: Порядковый номер задачи у своего устройства.
+        """
+        self.arrival_times = arrival_times
+        self.device_indices = device_indices
+        self.device_ids = device_ids
+        self.compute_demands = compute_demands
+        self.data_sizes = data_sizes
+        self.task_numbers = task_numbers
+
+    def __len__(self):
+        return len(self.arrival_times)
+
+    def task_id(self, i: int) -> str:
+        """
+        Идентификатор i-й задачи пакета.
+        """
+        return f"D{self.device_ids[i]}_T{self.task_numbers[i]}"
+
+    def tasks(self):
+        """
+        Итерирует задачи пакета в формате EdgeDevice.generate_task.
+
+        :return: Генератор (arrival_time, (compute_demand, data_size, task_id)).
+        """
+        arrival_times = self.arrival_times.tolist()
+        compute_demands = self.compute_demands.tolist()
+        data_sizes = self.data_sizes.tolist()
+        for i in range(len(arrival_times)):
+            yield arrival_times[i], (compute_demands[i], data_sizes[i], self.task_id(i))
+
+
+class DeviceFleet:
+    def __init__(self, device_ids, task_compute_demands, task_data_sizes, task_generation_frequencies, seed=None):
+        """
+        Парк edge-устройств, параметры которых хранятся массивами NumPy.
+        Задачи всех устройств за окно времени генерируются одним векторным вызовом.
+
+        :param device_ids: Номера устройств.
+        :param task_compute_demands: Требуемая мощность задач каждого устройства (FLOPS).
+        :param task_data_sizes: Объем данных задач каждого устройства (байты).
+        :param task_generation_frequencies: Частота генерации задач каждого устройства (задач/сек).
+        :param seed: seed (int) или SeedStream генератора поступлений.
+        """
+        self.device_ids = np.asarray(device_ids, dtype=np.int64)
+        self.task_compute_demands = np.asarray(task_compute_demands, dtype=np.float64)
+        self.task_data_sizes = np.asarray(task_data_sizes, dtype=np.float64)
+        self.task_generation_frequencies = np.asarray(task_generation_frequencies, dtype=np.float64)
+        self.task_id_counters = np.zeros(len(self.device_ids), dtype=np.int64)
+
+        if isinstance(seed, SeedStream):
+            seed = seed.entropy()
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_config(cls, devices_config, seed=None):
+        """
+        Создает парк из списка словарей с параметрами EdgeDevice (как DEVICES_CONFIG в main.py).
+        """
+        return cls([params["device_id"] for params in devices_config],
+                   [params["task_compute_demand"] for params in devices_config],
+                   [params["task_data_size"] for params in devices_config],
+                   [params["task_generation_frequency"] for params in devices_config],
+                   seed)
+
+    def __len__(self):
+        return len(self.device_ids)
+
+    def generate_window(self, t_start: float, t_end: float) -> TaskBatch:
+        """
+        Генерирует задачи всех устройств за окно [t_start, t_end) пуассоновским потоком:
+        количество задач устройства ~ Poisson(frequency * window), моменты поступления
+        равномерно распределены внутри окна.
+
+        :return: TaskBatch, отсортированный по времени поступления.
+        """
+        window = t_end - t_start
+        counts = self.rng.poisson(self.task_generation_frequencies * window)
+        device_indices = np.repeat(np.arange(len(self.device_ids)), counts)
+        arrival_times = t_start + self.rng.random(len(device_indices)) * window
+
+        # номера задач у каждого устройства продолжают счетчик устройства
+        first_number = np.repeat(self.task_id_counters + 1, counts)
+        offsets = np.arange(len(device_indices)) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.task_id_counters += counts
+
+        order = np.argsort(arrival_times, kind="stable")
+        device_indices = device_indices[order]
+        return TaskBatch(arrival_times[order],
+                         device_indices,
+                         self.device_ids[device_indices],
+                         self.task_compute_demands[device_indices],
+                         self.task_data_sizes[device_indices],
+                         (first_number + offsets)[order])
+
+    def device(self, index: int, clock=None, rng=None):
+        """
+        FleetEdgeDevice - представление одного устройства парка (параметры читаются из массивов парка).
+        """
+        from edge_device import EdgeDevice
+        return EdgeDevice.from_fleet(self, index, clock=clock, rng=rng)
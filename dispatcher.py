@@ -0,0 +1,100 @@
+import logging
+import queue
+import threading
+import time
+
+from latency import LatencyHistogram
+from task_distributor import task_distribution
+
+
+class ConcurrentDispatcher:
+    def __init__(self, distributor, dispatchers_count: int = 4):
+        """
+        Потокобезопасный фронтенд дистрибьютора: задачи попадают в общую очередь поступлений,
+        из которой их забирают dispatchers_count потоков-диспетчеров и одновременно
+        распределяют через distributor.distribute_task.
+
+        Диспетчер не ускоряет распределение: из-за GIL потоки выполняют distribute_task
+        по очереди, и с ростом числа диспетчеров пропускная способность не растет
+        (очередь только добавляет накладные расходы). Он нужен, чтобы задачи можно было
+        принимать из нескольких потоков без потерянных задач и без превышения ресурсов нод.
+
+        Ресурсы нод резервируются атомарно (Node.try_reserve), счетчик отклоненных задач
+        дистрибьютор увеличивает под блокировкой, а позиция обхода RoundRobin /
+        SmoothWeightedRoundRobin своя у каждого диспетчера (set_shard).
+        Интерфейс как у дистрибьюторов (distribute_task, rejected_tasks), поэтому
+        диспетчер подставляется в драйверы симуляции вместо дистрибьютора.
+        Часы нод должны допускать вызовы из нескольких потоков (RealTimeClock, TimerHeapClock).
+
+        :param distributor: Дистрибьютор задач, общий для всех диспетчеров.
+        :param dispatchers_count: Количество потоков-диспетчеров.
+        """
+        self.distributor = distributor
+        self._distribute = task_distribution(distributor)
+        self.arrivals = queue.Queue()
+        self.dispatched_tasks = [0] * dispatchers_count     # сколько задач распределил каждый диспетчер
+        # время ожидания задач в очереди поступлений, своя гистограмма у каждого диспетчера
+        self.queueing_latencies = [LatencyHistogram() for _ in range(dispatchers_count)]
+        self.threads = [threading.Thread(target=self._run, args=(shard,), name=f"dispatcher-{shard}", daemon=True)
+                        for shard in range(dispatchers_count)]
+        for thread in self.threads:
+            thread.start()
+
+    @property
+    def rejected_tasks(self):
+        return self.distributor.rejected_tasks
+
+    @property
+    def queueing_latency(self) -> LatencyHistogram:
+        """
+        Общая гистограмма времени ожидания задач в очереди поступлений (секунды).
+        """
+        histogram = LatencyHistogram()
+        for shard_histogram in self.queueing_latencies:
+            histogram.merge(shard_histogram)
+        return histogram
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
+        """
+        Ставит задачу в очередь поступлений, не дожидаясь распределения.
+
+        :param task_compute_demand: Требуемая мощность задачи (FLOPS).
+        :param task_data_size: Объем данных задачи (байты).
+        :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (передается дистрибьютору).
+        """
+        self.arrivals.put((task_compute_demand, task_data_size, task_id, arrival_time, time.monotonic()))
+
+    def _run(self, shard: int):
+        set_shard = getattr(self.distributor, "set_shard", None)
+        if set_shard is not None:
+            set_shard(shard, len(self.threads))
+
+        while True:
+            task = self.arrivals.get()
+            try:
+                if task is None:
+                    return
+                self.queueing_latencies[shard].record(time.monotonic() - task[4])
+                self._distribute(task[:4])
+                self.dispatched_tasks[shard] += 1
+            except Exception:
+                logging.exception("Dispatcher %s: failed to distribute task %s", shard, task[2])
+            finally:
+                self.arrivals.task_done()
+
+    def join(self):
+        """
+        Ждет, пока все поставленные в очередь задачи будут распределены.
+        """
+        self.arrivals.join()
+
+    def stop(self):
+        """
+        Распределяет оставшиеся в очереди задачи и останавливает диспетчеров.
+        """
+        for _ in self.threads:
+            self.arrivals.put(None)
+        for thread in self.threads:
+            thread.join()
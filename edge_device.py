@@ -1,8 +1,48 @@
-import time
-#
+import heapq
+import math
+import random
+
+from simulation_clock import RealTimeClock
+
+
+def poisson_interval(rng: random.Random, frequency: float) -> float:
+    """Интервал между задачами пуассоновского потока (экспоненциальное распределение)."""
+    return rng.expovariate(frequency)
+
+
+def deterministic_interval(rng: random.Random, frequency: float) -> float:
+    """Постоянный интервал между задачами."""
+    return 1 / frequency
+
+
+ARRIVAL_DISTRIBUTIONS = {
+    "poisson": poisson_interval,
+    "deterministic": deterministic_interval,
+}
+
+
+class _FleetField:
+    def __init__(self, array_name: str):
+        """
+        Параметр FleetEdgeDevice, который хранится в массиве DeviceFleet.
+
+        :param array_name: Имя массива в DeviceFleet.
+        """
+        self.array_name = array_name
+
+    def __get__(self, device, owner):
+        if device is None:
+            return self
+        return getattr(device._fleet, self.array_name)[device._fleet_index].item()
+
+    def __set__(self, device, value):
+        getattr(device._fleet, self.array_name)[device._fleet_index] = value
+
+
 class EdgeDevice:
     def __init__(self, device_id: int, task_compute_demand: float, task_data_size: float,
-                 task_generation_frequency: float):
+                 task_generation_frequency: float, clock=None, rng: random.Random = None,
+                 arrival_distribution="poisson"):
         """
         Класс edge-устройства.
 
@@ -10,16 +50,44 @@ class EdgeDevice:
         :param task_compute_demand: Требуемая мощность генерируемой задачи (FLOPS).
         :param task_data_size: Объем задачи в байтах для передачи по пропускному каналу.
         :param task_generation_frequency: Частота генерации задач (задач/сек).
+        :param clock: Часы симуляции (RealTimeClock, TimerHeapClock, AsyncioClock или VirtualClock). По умолчанию реальное время.
+        :param rng: Генератор случайных чисел устройства (для воспроизводимости - из SeedStream).
+        :param arrival_distribution: Распределение интервалов между задачами: "poisson", "deterministic"
+                                     или функция (rng, task_generation_frequency) -> интервал в секундах.
         """
         self.device_id = device_id
         self.task_compute_demand = task_compute_demand
         self.task_data_size = task_data_size
         self.task_generation_frequency = task_generation_frequency
+        self.clock = clock if clock is not None else RealTimeClock()
+        self.rng = rng if rng is not None else random.Random()
+        if callable(arrival_distribution):
+            self.arrival_interval = arrival_distribution
+        else:
+            self.arrival_interval = ARRIVAL_DISTRIBUTIONS[arrival_distribution]
         self.next_task_time = self.calculate_next_task_time()
         self.task_id_counter = 0
 
-    def calculate_next_task_time(self):
-        return time.time() + 1 / self.task_generation_frequency
+    @classmethod
+    def from_fleet(cls, fleet, index: int, clock=None, rng: random.Random = None,
+                   arrival_distribution="poisson"):
+        """
+        Создает FleetEdgeDevice - представление устройства index из DeviceFleet.
+        Параметры устройства читаются и записываются в массивы парка.
+        """
+        return FleetEdgeDevice(fleet, index, clock=clock, rng=rng, arrival_distribution=arrival_distribution)
+
+    def calculate_next_task_time(self, from_time: float = None):
+        """
+        Время генерации следующей задачи.
+
+        :param from_time: Момент, от которого отсчитывается интервал (по умолчанию - текущее время).
+        """
+        if self.task_generation_frequency <= 0:
+            return math.inf
+        if from_time is None:
+            from_time = self.clock.now()
+        return from_time + self.arrival_interval(self.rng, self.task_generation_frequency)
 
     def generate_task(self) -> tuple:
         """
@@ -28,7 +96,77 @@ class EdgeDevice:
         :return: Tuple с параметрами задачи (compute_demand, data_size, task_id).
         """
         self.task_id_counter += 1
-        # Обновляем время следующей генерации задачи
-        self.next_task_time = self.calculate_next_task_time()
-        task_id = f"D{self.device_id}_T{int(time.time())}"
-        return self.task_compute_demand, self.task_data_size, task_id
+        # Обновляем время следующей генерации задачи: отсчет от запланированного
+        # момента текущей задачи, чтобы поток не смещался из-за задержек драйвера
+        self.next_task_time = self.calculate_next_task_time(self.next_task_time)
+        return self.task_compute_demand, self.task_data_size, self.task_id()
+
+    def task_id(self) -> str:
+        """
+        Идентификатор текущей задачи устройства.
+        """
+        return f"D{self.device_id}_T{int(self.clock.now())}"
+
+
+class FleetEdgeDevice(EdgeDevice):
+    """
+    Edge-устройство - представление элемента DeviceFleet: параметры читаются и записываются
+    в массивы парка. Обычные EdgeDevice хранят их атрибутами, чтобы не платить за дескрипторы.
+    """
+    device_id = _FleetField("device_ids")
+    task_compute_demand = _FleetField("task_compute_demands")
+    task_data_size = _FleetField("task_data_sizes")
+    task_generation_frequency = _FleetField("task_generation_frequencies")
+    task_id_counter = _FleetField("task_id_counters")
+
+    def __init__(self, fleet, index: int, clock=None, rng: random.Random = None, arrival_distribution="poisson"):
+        """
+        :param fleet: DeviceFleet.
+        :param index: Номер устройства в массивах парка.
+        """
+        self._fleet = fleet
+        self._fleet_index = index
+        task_id_counter = fleet.task_id_counters[index].item()
+        super().__init__(fleet.device_ids[index].item(), fleet.task_compute_demands[index].item(),
+                         fleet.task_data_sizes[index].item(), fleet.task_generation_frequencies[index].item(),
+                         clock=clock, rng=rng, arrival_distribution=arrival_distribution)
+        # EdgeDevice.__init__ обнуляет счетчик - счетчик парка продолжается с прежнего значения
+        self.task_id_counter = task_id_counter
+
+    def task_id(self) -> str:
+        """
+        Идентификатор текущей задачи в формате TaskBatch: номер задачи по счетчику парка.
+        """
+        return f"D{self.device_id}_T{self.task_id_counter}"
+
+
+class ArrivalScheduler:
+    def __init__(self, devices: list):
+        """
+        Все edge-устройства в одной min-heap по времени следующей задачи.
+        Драйвер обращается только к устройствам, у которых подошло время,
+        стоимость одной задачи - O(log D).
+
+        :param devices: Список edge-устройств.
+        """
+        self._heap = [(device.next_task_time, i, device) for i, device in enumerate(devices)]
+        heapq.heapify(self._heap)
+
+    def next_arrival_time(self) -> float:
+        """
+        Время ближайшей задачи среди всех устройств.
+        """
+        return self._heap[0][0] if self._heap else math.inf
+
+    def pop_due(self, now: float):
+        """
+        Генерирует задачи всех устройств, у которых время следующей задачи <= now.
+
+        :return: Генератор (arrival_time, device, task) в порядке времени поступления.
+        """
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            arrival_time, i, device = heap[0]
+            task = device.generate_task()
+            heapq.heapreplace(heap, (device.next_task_time, i, device))
+            yield arrival_time, device, task
@@ -0,0 +1,153 @@
+import re
+import struct
+import threading
+
+from task_distributor import task_distribution
+
+# типы событий трассы
+ARRIVAL = 1             # задача поступила к дистрибьютору
+DISPATCH = 2            # дистрибьютор отдал задачу ноде
+REJECT = 3              # задача отклонена
+TRANSFER_START = 4      # нода начала прием данных задачи
+TRANSFER_END = 5        # данные задачи приняты
+EXECUTION_START = 6     # задержка перед выполнением прошла, задача выполняется
+COMPLETE = 7            # задача выполнена, ресурсы освобождены
+NODE_FAILURE = 8        # отказ ноды
+NODE_RECOVERY = 9       # нода восстановлена после отказа
+
+EVENT_NAMES = {
+    ARRIVAL: "arrival",
+    DISPATCH: "dispatch",
+    REJECT: "reject",
+    TRANSFER_START: "transfer_start",
+    TRANSFER_END: "transfer_end",
+    EXECUTION_START: "execution_start",
+    COMPLETE: "complete",
+    NODE_FAILURE: "node_failure",
+    NODE_RECOVERY: "node_recovery",
+}
+
+# запись фиксированной длины: время от начала трассы, тип события, идентификатор задачи,
+# устройство, нода, требуемая мощность (FLOPS) и объем данных (байты)
+RECORD = struct.Struct("<dB3x16siidd")
+TASK_ID_SIZE = 16
+
+# идентификаторы задач edge-устройств: "D<device_id>_T<номер>"
+_DEVICE_ID_PATTERN = re.compile(r"D(\d+)_")
+
+
+def device_id_of(task_id: str) -> int:
+    """
+    Номер устройства из идентификатора задачи EdgeDevice / DeviceFleet или -1.
+    """
+    match = _DEVICE_ID_PATTERN.match(task_id)
+    return int(match.group(1)) if match else -1
+
+
+class EventTrace:
+    def __init__(self, filename: str, clock):
+        """
+        Трасса событий симуляции в бинарном файле: каждое событие - запись RECORD
+        фиксированной длины, записи только дописываются в конец файла.
+        События нод пишутся, если нода подключена к трассе (attach_nodes), решения
+        дистрибьютора - через TracingDistributor.
+
+        :param filename: Имя файла трассы.
+        :param clock: Часы симуляции; время событий отсчитывается от создания трассы.
+        """
+        self.clock = clock
+        self.start_time = clock.now()
+        self.file = open(filename, "wb")
+        self.lock = threading.Lock()    # события пишут потоки нод и диспетчеров
+
+    def record(self, event: int, task_id: str = "", node_id: int = -1,
+               task_compute_demand: float = 0.0, task_data_size: float = 0.0):
+        """
+        Дописывает событие в трассу.
+        """
+        data = RECORD.pack(self.clock.now() - self.start_time, event, task_id.encode()[:TASK_ID_SIZE],
+                           device_id_of(task_id), node_id, task_compute_demand, task_data_size)
+        with self.lock:
+            self.file.write(data)
+
+    def attach_nodes(self, nodes: list):
+        """
+        Подключает ноды к трассе: этапы задач, отказы и восстановления нод попадают в трассу.
+        """
+        for node in nodes:
+            node.trace = self
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class TracingDistributor:
+    def __init__(self, distributor, trace: EventTrace):
+        """
+        Обертка дистрибьютора, которая пишет в трассу поступление каждой задачи
+        и решение дистрибьютора (DISPATCH с номером ноды или REJECT).
+        Остальные атрибуты (rejected_tasks, set_shard, ...) берутся у дистрибьютора.
+
+        :param distributor: Любой дистрибьютор из task_distributor.py.
+        :param trace: EventTrace.
+        """
+        self.distributor = distributor
+        self.trace = trace
+        self._distribute = task_distribution(distributor)
+
+    def __getattr__(self, name):
+        return getattr(self.distributor, name)
+
+    def _record_decision(self, node, task_compute_demand: float, task_data_size: float, task_id: str):
+        if node is None:
+            self.trace.record(REJECT, task_id, -1, task_compute_demand, task_data_size)
+        else:
+            self.trace.record(DISPATCH, task_id, node.node_id, task_compute_demand, task_data_size)
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
+        self.trace.record(ARRIVAL, task_id, -1, task_compute_demand, task_data_size)
+        node = self._distribute((task_compute_demand, task_data_size, task_id, arrival_time))
+        self._record_decision(node, task_compute_demand, task_data_size, task_id)
+        return node
+
+    def distribute_tasks(self, tasks: list) -> list:
+        for task in tasks:
+            task_compute_demand, task_data_size, task_id = task[:3]
+            self.trace.record(ARRIVAL, task_id, -1, task_compute_demand, task_data_size)
+        if hasattr(self.distributor, "distribute_tasks"):
+            assigned = self.distributor.distribute_tasks(tasks)
+        else:
+            assigned = list(map(self._distribute, tasks))
+        for node, task in zip(assigned, tasks):
+            self._record_decision(node, *task[:3])
+        return assigned
+
+
+def read_trace(filename: str):
+    """
+    Читает трассу в структурированный массив NumPy (поля time, event, task_id, device_id,
+    node_id, task_compute_demand, task_data_size), по элементу на событие.
+    """
+    import numpy as np
+    dtype = np.dtype({
+        "names": ["time", "event", "task_id", "device_id", "node_id", "task_compute_demand", "task_data_size"],
+        "formats": ["<f8", "u1", f"S{TASK_ID_SIZE}", "<i4", "<i4", "<f8", "<f8"],
+        "offsets": [0, 8, 12, 28, 32, 36, 44],
+        "itemsize": RECORD.size,
+    })
+    return np.fromfile(filename, dtype=dtype)
+
+
+def recorded_arrivals(records) -> list:
+    """
+    Поток поступлений из трассы.
+
+    :param records: Результат read_trace.
+    :return: Список (time, (task_compute_demand, task_data_size, task_id)) в порядке времени.
+    """
+    arrivals = records[records["event"] == ARRIVAL]
+    return [(float(time), (float(demand), float(size), task_id.decode()))
+            for time, task_id, demand, size in zip(arrivals["time"], arrivals["task_id"],
+                                                    arrivals["task_compute_demand"], arrivals["task_data_size"])]
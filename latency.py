@@ -0,0 +1,124 @@
+import math
+from bisect import bisect_left
+from itertools import accumulate
+
+
+class LatencyHistogram:
+    def __init__(self, min_value: float = 1e-6, max_value: float = 1e5, relative_error: float = 0.01):
+        """
+        Потоковая гистограмма задержек с логарифмическими корзинами (как HDR Histogram):
+        границы корзин растут в (1 + 2 * relative_error) раз, поэтому перцентили
+        считаются с относительной ошибкой не больше relative_error, а память не зависит
+        от количества значений. Счетчики хранятся только для непустых корзин, поэтому
+        пустая гистограмма (например, у простаивающей ноды) почти не занимает памяти.
+
+        :param min_value: Значения меньше min_value (в том числе 0) попадают в нулевую корзину.
+        :param max_value: Значения больше max_value попадают в последнюю корзину.
+        :param relative_error: Допустимая относительная ошибка перцентилей.
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self.relative_error = relative_error
+        self.log_growth = math.log1p(2 * relative_error)
+        self.buckets_count = math.ceil(math.log(max_value / min_value) / self.log_growth) + 2
+        self.counts = {}    # номер корзины -> количество значений
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _bucket(self, value: float) -> int:
+        if value < self.min_value:
+            return 0
+        return min(int(math.log(value / self.min_value) / self.log_growth) + 1, self.buckets_count - 1)
+
+    def _bucket_value(self, bucket: int) -> float:
+        if bucket == 0:
+            return 0.0
+        # середина корзины [lower, lower * (1 + 2 * relative_error))
+        return self.min_value * math.exp((bucket - 1) * self.log_growth) * (1 + self.relative_error)
+
+    def record(self, value: float):
+        """
+        Учитывает одно значение задержки (секунды).
+        """
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram"):
+        """
+        Добавляет значения другой гистограммы с теми же параметрами.
+        """
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, q=(50, 95, 99)) -> list:
+        """
+        Перцентили задержки (nearest rank), 0 для пустой гистограммы.
+
+        :param q: Уровни перцентилей (0..100).
+        """
+        if self.count == 0:
+            return [0.0] * len(q)
+        buckets = sorted(self.counts)
+        cumulative = list(accumulate(self.counts[bucket] for bucket in buckets))
+        result = []
+        for level in q:
+            rank = max(1, math.ceil(level / 100 * self.count))
+            bucket = buckets[bisect_left(cumulative, rank)]
+            result.append(min(max(self._bucket_value(bucket), self.min), self.max))
+        return result
+
+
+class TaskLatency:
+    # этапы жизненного цикла задачи на ноде
+    PHASES = ("queueing", "transfer", "delay", "execution", "total")
+
+    def __init__(self, **histogram_params):
+        """
+        Гистограммы задержек по этапам задачи: ожидание от поступления задачи до передачи
+        ноде, передача данных, ожидание перед выполнением, выполнение и полное время
+        от поступления задачи до завершения.
+
+        :param histogram_params: Параметры LatencyHistogram.
+        """
+        self.histograms = {phase: LatencyHistogram(**histogram_params) for phase in self.PHASES}
+
+    def record(self, arrival_time: float, dispatch_time: float, transfer_end_time: float,
+               execution_start_time: float, completion_time: float):
+        """
+        Учитывает временные метки одной выполненной задачи.
+        """
+        histograms = self.histograms
+        histograms["queueing"].record(dispatch_time - arrival_time)
+        histograms["transfer"].record(transfer_end_time - dispatch_time)
+        histograms["delay"].record(execution_start_time - transfer_end_time)
+        histograms["execution"].record(completion_time - execution_start_time)
+        histograms["total"].record(completion_time - arrival_time)
+
+    def merge(self, other: "TaskLatency"):
+        for phase, histogram in self.histograms.items():
+            histogram.merge(other.histograms[phase])
+
+    @classmethod
+    def combined(cls, latencies) -> "TaskLatency":
+        """
+        Общие гистограммы по нескольким нодам (например, всем нодам дистрибьютора).
+        """
+        result = cls()
+        for latency in latencies:
+            result.merge(latency)
+        return result
@@ -1,92 +1,60 @@
-import threading
-import queue
+import asyncio
 import time
-import random
 import logging
 import csv
 
-from node import Node
-from task_distributor import RoundRobin, WeightedRoundRobin, LeastConnection, WeightedLeastConnection
-from edge_device import EdgeDevice
+from Node import Node
+from task_distributor import (RoundRobin, WeightedRoundRobin, LeastConnection, WeightedLeastConnection,
+                              task_distribution)
+from edge_device import EdgeDevice, ArrivalScheduler
+from dispatcher import ConcurrentDispatcher
+from simulation_clock import RealTimeClock, VirtualClock, TimerHeapClock, AsyncioClock
+from random_streams import SeedStream
+from latency import TaskLatency
+from async_logging import setup_logging, stop_logging
+from event_trace import (EventTrace, TracingDistributor, read_trace, recorded_arrivals,
+                         NODE_FAILURE, NODE_RECOVERY)
+
+def summarize_nodes(nodes) -> dict:
+    """
+    Сводка по историям метрик всех нод сразу (analytics, требует NumPy): средние взвешенные
+    по времени (в том числе с учетом активной работы сервера) и перцентили.
 
-# Настройка логирования
-# для записи логов в файл:
-logging.basicConfig(filename='simulation.log', filemode='w', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-# для выводв логов в консоль:
-#logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    :return: Словарь {"load", "network", "tasks"} -> результат analytics.summarize_histories,
+             массивы по элементу на ноду в порядке nodes.
+    """
+    from analytics import summarize_histories
+    return {
+        "load": summarize_histories([node.load_history for node in nodes]),
+        "network": summarize_histories([node.network_load_history for node in nodes]),
+        "tasks": summarize_histories([node.running_tasks_history for node in nodes]),
+    }
 
 #
-def save_data_to_csv(nodes):
-    """Похоже на функцию calc_tests_results, но с сохранением данных в csv"""
+def save_data_to_csv(nodes, filename="node_results.csv", verbose: bool = True):
+    """Похоже на функцию calc_tests_results, но с сохранением данных в csv
+
+    :param filename: Имя файла для сохранения.
+    :param verbose: Печатать сообщение о сохранении файла.
+    :return: Список словарей с результатами по нодам.
+    """
 
     node_data = []      # список, который будет записываться в csv
+    summary = summarize_nodes(nodes)
 
-    for node in nodes:
+    for i, node in enumerate(nodes):
         current_node_data = {}
 
-        total_weighted_load = 0
-        total_weighted_network_load = 0
-        total_weighted_tasks_load = 0
-        total_time = 0
-
         current_node_data['Node'] = node.node_id
 
-        # среднее взвешенное по нагрузке с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.load_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_load == 0:
-            current_node_data['Weighted Load (%)'] = 0
-        else:
-            weighted_avg = total_weighted_load / total_time
-            current_node_data['Weighted Load (%)'] = round(weighted_avg, 4)
-
-        total_time = 0
-
-        # среднее взвешенное по нагрузке сети с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.network_load_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_network_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_network_load == 0:
-            current_node_data['Weighted Network Load (%)'] = 0
-        else:
-            weighted_avg = total_weighted_network_load / total_time
-            current_node_data['Weighted Network Load (%)'] = round(weighted_avg, 4)
-
-        total_time = 0
-
-        # среднее взвешенное по количеству задач с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.running_tasks_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_tasks_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_tasks_load == 0:
-            current_node_data['Weighted Tasks Load (pieces)'] = 0
-        else:
-            weighted_avg = total_weighted_tasks_load / total_time
-            current_node_data['Weighted Tasks Load (pieces)'] = round(weighted_avg, 4)
+        # средние взвешенные по нагрузке, нагрузке сети и количеству задач с учетом активной работы сервера
+        current_node_data['Weighted Load (%)'] = round(float(summary["load"]["active_weighted_mean"][i]), 4)
+        current_node_data['Weighted Network Load (%)'] = round(float(summary["network"]["active_weighted_mean"][i]), 4)
+        current_node_data['Weighted Tasks Load (pieces)'] = round(float(summary["tasks"]["active_weighted_mean"][i]), 4)
 
         current_node_data['Total Calculated Tasks'] = node.done_tasks_count
         node_data.append(current_node_data)
 
-    # Имя файла для сохранения
-    filename = "node_results.csv"
-
     # Запись данных в CSV
     with open(filename, mode="w", newline="", encoding="utf-8") as file:
         # Определяем заголовки
@@ -103,11 +71,18 @@ def save_data_to_csv(nodes):
         for data in node_data:
             writer.writerow(data)
 
-    print(f"Данные успешно сохранены в файл: {filename}")
+    if verbose:
+        print(f"Данные успешно сохранены в файл: {filename}")
+
+    return node_data
+
 
+def calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulation_duration, queueing_latency=None):
+    """Функция отписывает результаты в консоль
 
-def calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulation_duration):
-    """Функция отписывает результаты в консоль"""
+    :param queueing_latency: LatencyHistogram ожидания задач в очереди диспетчеров (ConcurrentDispatcher),
+                             часть этапа queueing.
+    """
     total_weighted_load_list = []       # нагрузка серверов в активное время
 
     print("Nodes params:\n---------")
@@ -122,112 +97,67 @@ def calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulat
 
     total_calculated_tasks = 0
 
-    print(f"---------")
-    for node in nodes:
-        total_weighted_load = 0
-        total_weighted_network_load = 0
-        total_weighted_tasks_load = 0
-        total_time = 0
+    # средние взвешенные и перцентили по историям метрик всех нод сразу
+    summary = summarize_nodes(nodes)
 
+    print(f"---------")
+    for i, node in enumerate(nodes):
         # среднее взвешенное по нагрузке
-        for i in range(len(node.load_history) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = node.load_history[i]
-            t_next, l_next = node.load_history[i+1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_load == 0:
+        weighted_avg = summary["load"]["weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted load of Node {node.node_id}: 0 %")
         else:
-            weighted_avg = total_weighted_load / total_time
             print(f"Weighted load of Node {node.node_id}: {weighted_avg:.4f} %")
-        total_time = 0
-        total_weighted_load = 0
 
         # среднее взвешенное по нагрузке с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.load_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_load == 0:
+        weighted_avg = summary["load"]["active_weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted load of active time Node {node.node_id}: 0 %")
             total_weighted_load_list.append(0)
         else:
-            weighted_avg = total_weighted_load / total_time
-            total_weighted_load_list.append(round(weighted_avg, 4))
+            total_weighted_load_list.append(round(float(weighted_avg), 4))
             print(f"Weighted load of active time Node {node.node_id}: {weighted_avg:.4f} %")
-        total_time = 0
 
         # среднее взвешенное по нагрузке сети
-        for i in range(len(node.network_load_history) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = node.network_load_history[i]
-            t_next, l_next = node.network_load_history[i+1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_network_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_network_load == 0:
+        weighted_avg = summary["network"]["weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted network load of Node {node.node_id}: 0 %")
         else:
-            weighted_avg = total_weighted_network_load / total_time
             print(f"Weighted network load of Node {node.node_id}: {weighted_avg:.4f} %")
-        total_time = 0
-        total_weighted_network_load = 0
 
         # среднее взвешенное по нагрузке сети с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.network_load_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_network_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_network_load == 0:
+        weighted_avg = summary["network"]["active_weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted network load of active time Node {node.node_id}: 0 %")
         else:
-            weighted_avg = total_weighted_network_load / total_time
             print(f"Weighted network load of active time Node {node.node_id}: {weighted_avg:.4f} %")
-        total_time = 0
 
         # среднее взвешенное по количеству задач
-        for i in range(len(node.running_tasks_history) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = node.running_tasks_history[i]
-            t_next, l_next = node.running_tasks_history[i + 1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_tasks_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_tasks_load == 0:
+        weighted_avg = summary["tasks"]["weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted tasks load of Node {node.node_id}: 0 pieces")
         else:
-            weighted_avg = total_weighted_tasks_load / total_time
             print(f"Weighted tasks load of Node {node.node_id}: {weighted_avg:.4f} pieces")
-        total_time = 0
-        total_weighted_tasks_load = 0
 
         # среднее взвешенное по количеству задач с учетом активной работы сервера
-        filtered_data = [(t, L) for t, L in node.running_tasks_history if L > 0]
-        for i in range(len(filtered_data) - 1):  # (0.2052457332611084, 80.0), (0.2057654857635498, 75.0),
-            t_i, l_i = filtered_data[i]
-            t_next, l_next = filtered_data[i + 1]
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_tasks_load += l_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительность
-
-        if total_weighted_tasks_load == 0:
+        weighted_avg = summary["tasks"]["active_weighted_mean"][i]
+        if weighted_avg == 0:
             print(f"Weighted tasks load of active time Node {node.node_id}: 0 pieces")
         else:
-            weighted_avg = total_weighted_tasks_load / total_time
             print(f"Weighted tasks load of active time Node {node.node_id}: {weighted_avg:.4f} pieces")
-        total_time = 0
-        total_weighted_tasks_load = 0
+
+        p50, p95, p99 = summary["load"]["percentiles"][i]
+        print(f"Load p50/p95/p99 of Node {node.node_id}: {p50:.4f} / {p95:.4f} / {p99:.4f} %")
+        p50, p95, p99 = summary["tasks"]["percentiles"][i]
+        print(f"Tasks p50/p95/p99 of Node {node.node_id}: {p50:.2f} / {p95:.2f} / {p99:.2f} pieces")
+
+        # задержки выполненных задач: полное время и средние по этапам
+        latency = node.task_latency.histograms
+        p50, p95, p99 = latency["total"].percentiles()
+        print(f"Task latency p50/p95/p99 of Node {node.node_id}: {p50:.4f} / {p95:.4f} / {p99:.4f} sec")
+        print(f"Task latency breakdown of Node {node.node_id}: queueing {latency['queueing'].mean():.4f}, "
+              f"transfer {latency['transfer'].mean():.4f}, delay {latency['delay'].mean():.4f}, "
+              f"execution {latency['execution'].mean():.4f} sec")
 
         print(f"Node {node.node_id} calculated {node.done_tasks_count} tasks")
         total_calculated_tasks += node.done_tasks_count
@@ -241,6 +171,16 @@ def calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulat
     print(f"Simulation duration: {simulation_duration}")
     print(total_weighted_load_list)
 
+    # задержки по всем нодам (по дистрибьютору в целом)
+    print(f"---------")
+    latency = TaskLatency.combined(node.task_latency for node in nodes).histograms
+    if queueing_latency is not None:
+        latency = dict(dispatcher_queue=queueing_latency, **latency)
+    for phase, histogram in latency.items():
+        p50, p95, p99 = histogram.percentiles()
+        print(f"Task latency ({phase}): mean {histogram.mean():.4f}, "
+              f"p50/p95/p99 {p50:.4f} / {p95:.4f} / {p99:.4f} sec")
+
 
 
 def save_results_to_csv(nodes, total_created_tasks, total_rejected_tasks, simulation_duration):
@@ -274,10 +214,7 @@ def save_results_to_csv(nodes, total_created_tasks, total_rejected_tasks, simula
             writer.writerows(node.running_tasks_history)
 
 
-        time.sleep(16)
-
-
-    logging.info(f"Simulation results saved to {filename}")
+    logging.info("Simulation results saved to %s", filename)
 
 
 def calc_weights(nodes: list):
@@ -307,54 +244,441 @@ def calc_weights(nodes: list):
         print(f"Node {i+1} normalized weight = {normalized_weight}")
 
 
+def log_nodes_state(relative_time, nodes):
+    """
+    Такт симуляции: логирование состояния нод каждую секунду.
+
+    :param relative_time: Относительное время с начала симуляции.
+    """
+    prev_relative_time = relative_time - 0.5
+
+    # Логирование состояния нод каждую секунду
+    if int(relative_time) - int(prev_relative_time) >= 0.5:
+        for node in nodes:
+            node.log_current_state(relative_time)
+
+
+def dispatch_arrivals(arrivals, now, nodes, distributor):
+    """
+    Генерирует задачи устройств, у которых подошло время, и отдает их дистрибьютору
+    одним пакетом (distribute_tasks), если дистрибьютор это поддерживает.
+
+    :param arrivals: ArrivalScheduler со всеми edge-устройствами.
+    :param now: Текущее время часов симуляции.
+    :return: Количество созданных задач.
+    """
+    tasks = []
+    debug = logging.root.isEnabledFor(logging.DEBUG)
+    for arrival_time, device, (task_compute_demand, task_data_size, task_id) in arrivals.pop_due(now):
+        if debug:
+            logging.debug("Edge Device %s: Task %s generated. \nParams:\n "
+                          "task_compute_demand = %s,\n "
+                          "task_data_size = %s", device.device_id, task_id, task_compute_demand, task_data_size)
+
+            #  отладочная информация для отслеживания параметров нод
+            for node in nodes:
+                logging.debug("\n---\nNode %s\n"
+                              "flops_load = %s,\n"
+                              "network_bytes_load = %s\n---",
+                              node.node_id, node.current_load_flops, node.current_network_load_bytes)
+
+        # время поступления - запланированный момент создания задачи устройством
+        tasks.append((task_compute_demand, task_data_size, task_id, arrival_time))
+
+    if hasattr(distributor, "distribute_tasks"):
+        distributor.distribute_tasks(tasks)
+    else:
+        distribute = task_distribution(distributor)
+        for task in tasks:
+            distribute(task)
+
+    return len(tasks)
+
+
+def run_realtime_simulation(nodes, devices, distributor, duration, tick_seconds=0.25, drain_seconds=16):
+    """
+    Симуляция в реальном времени: каждая секунда симуляции занимает секунду.
+
+    :param duration: Длительность симуляции в секундах.
+    :param tick_seconds: Интервал логирования состояния нод.
+    :param drain_seconds: Время ожидания завершения задач после окончания симуляции.
+    :return: Количество созданных задач.
+    """
+    start_time = time.time()
+    for node in nodes:
+        node.start_time = start_time
+
+    arrivals = ArrivalScheduler(devices)
+    total_created_tasks = 0
+    end_time = start_time + duration
+    next_tick = start_time
+
+    # Отказы нод - события, а не проверка в каждом такте
+    for node in nodes:
+        node.start_failure_process(tick_seconds)
+
+    try:
+        while time.time() < end_time:
+            now = time.time()
+            if now >= next_tick:
+                log_nodes_state(now - start_time, nodes)
+                next_tick += tick_seconds
+
+            total_created_tasks += dispatch_arrivals(arrivals, now, nodes, distributor)
+
+            # Спим до ближайшего события: такта или поступления задачи
+            wake_time = min(next_tick, arrivals.next_arrival_time(), end_time)
+            time.sleep(max(0.0, wake_time - time.time()))
+
+        for node in nodes:
+            node.stop_failure_process()
+
+        # Ждем завершения задач, которые еще выполняются
+        time.sleep(drain_seconds)
+
+    except KeyboardInterrupt:
+        logging.info("Simulation stopped by user.")
+
+    return total_created_tasks
+
+
+def run_virtual_simulation(nodes, devices, distributor, duration, clock, tick_seconds=0.25):
+    """
+    Дискретно-событийная симуляция в виртуальном времени. Такты, поступления задач
+    и этапы задач планируются в календаре событий clock, поэтому симуляция не ждет
+    реального времени.
+
+    :param duration: Длительность симуляции в секундах виртуального времени.
+    :param clock: VirtualClock, общий для нод и edge-устройств.
+    :param tick_seconds: Интервал логирования состояния нод.
+    :return: Количество созданных задач.
+    """
+    start_time = clock.now()
+    end_time = start_time + duration
+    for node in nodes:
+        node.start_time = start_time
+
+    arrivals = ArrivalScheduler(devices)
+    created_tasks = [0]
+
+    def tick():
+        log_nodes_state(clock.now() - start_time, nodes)
+
+        if clock.now() + tick_seconds < end_time:
+            clock.call_later(tick_seconds, tick)
+
+    def arrival():
+        created_tasks[0] += dispatch_arrivals(arrivals, clock.now(), nodes, distributor)
+
+        # в календаре всегда одно событие поступления - ближайшее по всем устройствам
+        next_arrival_time = arrivals.next_arrival_time()
+        if next_arrival_time < end_time:
+            clock.call_at(next_arrival_time, arrival)
+
+    # Отказы нод - события в том же календаре
+    for node in nodes:
+        node.start_failure_process(tick_seconds)
+
+    clock.call_at(start_time, tick)
+    if arrivals.next_arrival_time() < end_time:
+        clock.call_at(arrivals.next_arrival_time(), arrival)
+    clock.run(until=end_time)
+
+    for node in nodes:
+        node.stop_failure_process()
+
+    # Дорабатываем задачи, которые еще выполняются
+    clock.run()
+
+    return created_tasks[0]
+
+
+def run_fleet_simulation(nodes, fleet, distributor, duration, clock, tick_seconds=0.25):
+    """
+    Дискретно-событийная симуляция с парком устройств DeviceFleet: задачи всех устройств
+    генерируются пакетом на каждый такт и планируются в календаре событий clock.
+
+    :param fleet: DeviceFleet.
+    :param duration: Длительность симуляции в секундах виртуального времени.
+    :param clock: VirtualClock, общий для нод.
+    :param tick_seconds: Окно генерации пакета задач и интервал логирования состояния нод.
+    :return: Количество созданных задач.
+    """
+    start_time = clock.now()
+    end_time = start_time + duration
+    for node in nodes:
+        node.start_time = start_time
+
+    created_tasks = [0]
+    distribute = task_distribution(distributor)
+
+    def tick():
+        now = clock.now()
+        log_nodes_state(now - start_time, nodes)
+
+        batch = fleet.generate_window(now, min(now + tick_seconds, end_time))
+        created_tasks[0] += len(batch)
+        for arrival_time, task in batch.tasks():
+            clock.call_at(arrival_time, distribute, (*task, arrival_time))
+
+        if now + tick_seconds < end_time:
+            clock.call_later(tick_seconds, tick)
+
+    # Отказы нод - события в том же календаре
+    for node in nodes:
+        node.start_failure_process(tick_seconds)
+
+    clock.call_at(start_time, tick)
+    clock.run(until=end_time)
+
+    for node in nodes:
+        node.stop_failure_process()
+
+    # Дорабатываем задачи, которые еще выполняются
+    clock.run()
+
+    return created_tasks[0]
+
+
+def run_replay_simulation(nodes, records, distributor, clock, tick_seconds=0.25, replay_failures=True):
+    """
+    Повтор записанной трассы (event_trace) в виртуальном времени: задачи поступают
+    к дистрибьютору в те же моменты и с теми же параметрами, что и при записи,
+    поэтому алгоритмы сравниваются на одной и той же нагрузке.
+
+    :param records: Трасса (event_trace.read_trace).
+    :param clock: VirtualClock, общий для нод.
+    :param tick_seconds: Интервал логирования состояния нод.
+    :param replay_failures: Повторять записанные отказы и восстановления нод.
+                            False - ноды отказывают по своей модели отказов.
+    :return: Количество созданных задач.
+    """
+    start_time = clock.now()
+    for node in nodes:
+        node.start_time = start_time
+
+    arrivals = recorded_arrivals(records)
+    end_time = start_time + (arrivals[-1][0] if arrivals else 0.0)
+    next_arrival = [0]  # номер ближайшего поступления
+    distribute = task_distribution(distributor)
+
+    def tick():
+        log_nodes_state(clock.now() - start_time, nodes)
+
+        if clock.now() + tick_seconds < end_time:
+            clock.call_later(tick_seconds, tick)
+
+    def arrival():
+        # все задачи с одинаковым временем поступления отдаются одним пакетом
+        now = clock.now()
+        tasks = []
+        while next_arrival[0] < len(arrivals) and start_time + arrivals[next_arrival[0]][0] <= now:
+            arrival_time, task = arrivals[next_arrival[0]]
+            tasks.append((*task, start_time + arrival_time))
+            next_arrival[0] += 1
+
+        if hasattr(distributor, "distribute_tasks"):
+            distributor.distribute_tasks(tasks)
+        else:
+            for task in tasks:
+                distribute(task)
+
+        if next_arrival[0] < len(arrivals):
+            clock.call_at(start_time + arrivals[next_arrival[0]][0], arrival)
+
+    if replay_failures:
+        nodes_by_id = {node.node_id: node for node in nodes}
+        for record in records[(records["event"] == NODE_FAILURE) | (records["event"] == NODE_RECOVERY)]:
+            node = nodes_by_id.get(int(record["node_id"]))
+            if node is not None:
+                clock.call_at(start_time + float(record["time"]),
+                              node.fail if record["event"] == NODE_FAILURE else node.recover)
+    else:
+        for node in nodes:
+            node.start_failure_process(tick_seconds)
+
+    clock.call_at(start_time, tick)
+    if arrivals:
+        clock.call_at(start_time + arrivals[0][0], arrival)
+    clock.run(until=end_time)
+
+    for node in nodes:
+        node.stop_failure_process()
+
+    # Дорабатываем задачи, которые еще выполняются
+    clock.run()
+
+    return len(arrivals)
+
+
+async def run_asyncio_simulation(nodes, devices, distributor, duration, clock, tick_seconds=0.25):
+    """
+    Симуляция в реальном времени на asyncio: такты, поступления задач, этапы задач
+    и отказы нод выполняются корутинами одного event loop.
+
+    :param duration: Длительность симуляции в секундах.
+    :param clock: AsyncioClock, общий для нод и edge-устройств.
+    :param tick_seconds: Интервал логирования состояния нод.
+    :return: Количество созданных задач.
+    """
+    start_time = clock.now()
+    for node in nodes:
+        node.start_time = start_time
+
+    arrivals = ArrivalScheduler(devices)
+    total_created_tasks = 0
+    end_time = start_time + duration
+    next_tick = start_time
+
+    # Отказы нод - события, а не проверка в каждом такте
+    for node in nodes:
+        node.start_failure_process(tick_seconds)
+
+    while clock.now() < end_time:
+        now = clock.now()
+        if now >= next_tick:
+            log_nodes_state(now - start_time, nodes)
+            next_tick += tick_seconds
+
+        total_created_tasks += dispatch_arrivals(arrivals, now, nodes, distributor)
+
+        # Спим до ближайшего события: такта или поступления задачи
+        wake_time = min(next_tick, arrivals.next_arrival_time(), end_time)
+        await asyncio.sleep(max(0.0, wake_time - clock.now()))
+
+    for node in nodes:
+        node.stop_failure_process()
+
+    # Ждем завершения задач, которые еще выполняются
+    await clock.wait()
+
+    return total_created_tasks
+
+
+def create_nodes(nodes_config, clock, seed_stream=None):
+    """
+    Создает ноды по списку параметров.
+
+    :param nodes_config: Список словарей с параметрами Node.
+    :param clock: Часы симуляции.
+    :param seed_stream: SeedStream, из которого каждая нода получает свой генератор.
+    """
+    if seed_stream is None:
+        return [Node(**params, clock=clock) for params in nodes_config]
+    streams = seed_stream.spawn(len(nodes_config))
+    return [Node(**params, clock=clock, rng=stream.generator()) for params, stream in zip(nodes_config, streams)]
+
+
+def create_devices(devices_config, clock, seed_stream=None):
+    """
+    Создает edge-устройства по списку параметров.
+
+    :param devices_config: Список словарей с параметрами EdgeDevice.
+    :param clock: Часы симуляции.
+    :param seed_stream: SeedStream, из которого каждое устройство получает свой генератор.
+    """
+    if seed_stream is None:
+        return [EdgeDevice(**params, clock=clock) for params in devices_config]
+    streams = seed_stream.spawn(len(devices_config))
+    return [EdgeDevice(**params, clock=clock, rng=stream.generator())
+            for params, stream in zip(devices_config, streams)]
+
+
 #  config of simulation
 simulation_duration = 15  # Длительность симуляции в секундах
+# "virtual" - виртуальное время, "realtime" - реальное время (поток на задачу),
+# "timer_heap" - реальное время с одним потоком-планировщиком, "asyncio" - реальное время на asyncio,
+# "fleet" - виртуальное время, задачи генерирует парк устройств DeviceFleet пакетами по тактам
+simulation_mode = "virtual"
+random_seed = 1     # seed запуска, из него выводятся генераторы каждой ноды и устройства
+# количество потоков-диспетчеров для режимов "realtime" и "timer_heap" (1 - распределение в основном потоке)
+dispatchers_count = 1
+# хранить состояние нод массивами NumPy (ClusterState) и выбирать ноду векторно, а не по индексам
+use_cluster_state = False
+# записывать трассу событий (event_trace) в файл, None - не записывать
+trace_filename = None   # например "simulation.trace"
+# режим "virtual": повторить поступления задач из записанной трассы вместо edge-устройств, None - не повторять
+replay_filename = None
+
+# Конфигурация нод
+NODES_CONFIG = [
+    dict(node_id=1, compute_power_flops=1000, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=2, compute_power_flops=405, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=3, compute_power_flops=404, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=4, compute_power_flops=403, delay_seconds=0.1, bandwidth_bytes=1500, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=5, compute_power_flops=800, delay_seconds=0.1, bandwidth_bytes=1000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=6, compute_power_flops=1000, delay_seconds=0.1, bandwidth_bytes=500, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=7, compute_power_flops=820, delay_seconds=0.1, bandwidth_bytes=600, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=8, compute_power_flops=920, delay_seconds=0.1, bandwidth_bytes=1000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=9, compute_power_flops=700, delay_seconds=0.1, bandwidth_bytes=700, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=10, compute_power_flops=880, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=11, compute_power_flops=396, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4),
+    dict(node_id=12, compute_power_flops=395, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2, downtime_seconds=4)
+]
+
+# Конфигурация edge-устройств: задачи поступают пуассоновским потоком
+# с интенсивностью task_generation_frequency (задач/сек) у каждого устройства
+DEVICES_CONFIG = [
+    dict(device_id=1, task_compute_demand=500, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=400, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
+    dict(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10)
+]
 
 
 
 if __name__ == "__main__":
+    # Настройка логирования: записи пишет фоновый поток, записи по каждой задаче - на уровне DEBUG
+    # для записи логов в файл:
+    log_listener = setup_logging('simulation.log', level=logging.INFO)
+    # для компактного бинарного журнала (чтение: async_logging.read_binary_log):
+    # log_listener = setup_logging(None, level=logging.INFO, binary_filename='simulation.binlog')
+    # для выводв логов в консоль:
+    # log_listener = setup_logging(None, level=logging.INFO)
+
+    # независимые потоки случайных чисел для нод и устройств
+    nodes_seed_stream, devices_seed_stream = SeedStream(random_seed).spawn(2)
+
+    if simulation_mode in ("virtual", "fleet"):
+        clock = VirtualClock()
+    elif simulation_mode == "timer_heap":
+        clock = TimerHeapClock()
+    elif simulation_mode == "asyncio":
+        clock = AsyncioClock()
+    else:
+        clock = RealTimeClock()
+
     # Создаем ноды
-    nodes = [
-        Node(node_id=1, compute_power_flops=1000, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=2, compute_power_flops=405, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=3, compute_power_flops=404, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=4, compute_power_flops=403, delay_seconds=0.1, bandwidth_bytes=1500, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=5, compute_power_flops=800, delay_seconds=0.1, bandwidth_bytes=1000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=6, compute_power_flops=1000, delay_seconds=0.1, bandwidth_bytes=500, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=7, compute_power_flops=820, delay_seconds=0.1, bandwidth_bytes=600, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=8, compute_power_flops=920, delay_seconds=0.1, bandwidth_bytes=1000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=9, compute_power_flops=700, delay_seconds=0.1, bandwidth_bytes=700, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=10, compute_power_flops=880, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=11, compute_power_flops=396, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4),
-        Node(node_id=12, compute_power_flops=395, delay_seconds=0.1, bandwidth_bytes=2000, failure_probability=0.2,
-             downtime_seconds=4)
-    ]
+    nodes = create_nodes(NODES_CONFIG, clock, nodes_seed_stream)
 
     calc_weights(nodes)
 
 
-    # Устанавливаем start_time для всех нод
-    start_time = time.time()
-    for node in nodes:
-        node.start_time = start_time
-
     # Создаем дистрибьютор задач
-    distributor = RoundRobin(nodes)
+    cluster_state = None
+    if use_cluster_state:
+        from cluster_state import ClusterState
+        cluster_state = ClusterState(nodes)
+    distributor = RoundRobin(nodes, cluster_state)
 
     # печатаем название класса
     class_name = type(distributor).__name__
     print(class_name)
+
+    trace = None
+    if trace_filename is not None:
+        trace = EventTrace(trace_filename, clock)
+        trace.attach_nodes(nodes)
+        distributor = TracingDistributor(distributor, trace)
+
+    if dispatchers_count > 1 and simulation_mode in ("realtime", "timer_heap"):
+        distributor = ConcurrentDispatcher(distributor, dispatchers_count)
     # Создаем edge-устройства
     # devices = [
     #     EdgeDevice(device_id=1, task_compute_demand=300, task_data_size=200, task_generation_frequency=0.5),
@@ -369,77 +693,38 @@ if __name__ == "__main__":
     #     EdgeDevice(device_id=10, task_compute_demand=40, task_data_size=30, task_generation_frequency=0.3)
     # ]
 
-    # ну судя по всему частота генерации задач будет задавать количечством устройств
-    # я хз как по другому выкрутить
-    # крч кол-во устройств == кол-во задач в секунду
-    # секунда это с какой частотой симуляция идет, та пауза в виде sleep(1)
-    devices = [
-            EdgeDevice(device_id=1, task_compute_demand=500, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=200, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=400, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10),
-            EdgeDevice(device_id=1, task_compute_demand=100, task_data_size=100, task_generation_frequency=10)
-    ]
-
-    # Стартовые метрики
-    total_created_tasks = 0
-    total_rejected_tasks = 0
-
-    end_time = start_time + simulation_duration
-
-    try:
-        while time.time() < end_time:
-            current_time = time.time()
-            relative_time = current_time - start_time
-            prev_relative_time = relative_time - 0.5
-
-
-            # Логирование состояния нод каждую секунду
-            if int(relative_time) - int(prev_relative_time) >= 0.5:
-                for node in nodes:
-                    prev_relative_time = relative_time
-                    node.log_current_state(relative_time)
-
-            for device in devices:
-                # Логирование состояния нод каждую секунду
-                if int(relative_time) != int(relative_time - 1):
-
-                # if random.random() < device.task_generation_frequency:
-                # if current_time >= device.next_task_time:
-
-                    # вообще это некорректно, нужно проверять текущее время и частоты генерации задач устройства
-                    task_compute_demand, task_data_size, task_id = device.generate_task()
-                    logging.info(f"Edge Device {device.device_id}: Task {task_id} generated. \nParams:\n "
-                                 f"task_compute_demand = {task_compute_demand},\n "
-                                 f"task_data_size = {task_data_size}")
-
-                    #  отладочная информация для отслеживания параметров нод
-                    for node in nodes:
-                        logging.info(f"\n---\nNode {node.node_id}\n"
-                                     f"flops_load = {node.current_load_flops},\n"
-                                     f"network_bytes_load = {node.current_network_load_bytes}\n---")
-
-                    distributor.distribute_task(task_compute_demand, task_data_size, task_id)
-
-                    total_created_tasks += 1
-
-            # Симулируем отключение нод
-            for node in nodes:
-                threading.Thread(target=node.simulate_failure).start()
-
-            time.sleep(0.25)  # Пауза между итерациями симуляции
-
-    except KeyboardInterrupt:
-        logging.info("Simulation stopped by user.")
+    if simulation_mode == "fleet":
+        # парк устройств на массивах NumPy вместо отдельных EdgeDevice
+        from device_fleet import DeviceFleet
+        fleet = DeviceFleet.from_config(DEVICES_CONFIG, devices_seed_stream)
+    else:
+        devices = create_devices(DEVICES_CONFIG, clock, devices_seed_stream)
+
+    if simulation_mode == "fleet":
+        total_created_tasks = run_fleet_simulation(nodes, fleet, distributor, simulation_duration, clock)
+    elif simulation_mode == "virtual" and replay_filename is not None:
+        total_created_tasks = run_replay_simulation(nodes, read_trace(replay_filename), distributor, clock)
+    elif simulation_mode == "virtual":
+        total_created_tasks = run_virtual_simulation(nodes, devices, distributor, simulation_duration, clock)
+    elif simulation_mode == "asyncio":
+        total_created_tasks = asyncio.run(
+            run_asyncio_simulation(nodes, devices, distributor, simulation_duration, clock))
+    else:
+        total_created_tasks = run_realtime_simulation(nodes, devices, distributor, simulation_duration)
+
+    if isinstance(distributor, ConcurrentDispatcher):
+        distributor.stop()
 
     # Сохраняем результаты
     total_rejected_tasks = distributor.rejected_tasks
     save_results_to_csv(nodes, total_created_tasks, total_rejected_tasks, simulation_duration)
-    calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulation_duration)
+    from results_io import save_results
+    save_results("simulation_results.npz", nodes, total_created_tasks, total_rejected_tasks, simulation_duration)
+    calc_tests_results(nodes, total_created_tasks, total_rejected_tasks, simulation_duration,
+                       distributor.queueing_latency if isinstance(distributor, ConcurrentDispatcher) else None)
+
+    save_data_to_csv(nodes)
 
-    save_data_to_csv(nodes)
\ No newline at end of file
+    if trace is not None:
+        trace.close()
+    stop_logging(log_listener)
\ No newline at end of file
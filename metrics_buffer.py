@@ -0,0 +1,162 @@
+from array import array
+
+
+class MetricsBuffer:
+    def __init__(self, value_typecode: str = "d", capacity: int = None, chunk_size: int = 1024):
+        """
+        История метрики ноды [(time, value)] в колоночном виде: времена и значения хранятся
+        в двух массивах array (8 байт на число вместо ~100 байт на кортеж в списке).
+        Для чтения ведет себя как список кортежей: len, индексы, срезы, итерация.
+
+        :param value_typecode: Тип значений array ("d" - float, "q" - int).
+        :param capacity: Если задан - кольцевой буфер: хранятся только последние capacity точек.
+        :param chunk_size: На сколько точек (не меньше) увеличиваются массивы при заполнении.
+                           Без capacity массивы создаются пустыми и растут с первой точки,
+                           поэтому история простаивающей ноды не занимает памяти.
+        """
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        size = capacity if capacity is not None else 0
+        self.times = array("d", bytes(array("d").itemsize * size))
+        self.values = array(value_typecode, bytes(array(value_typecode).itemsize * size))
+        self.size = 0   # количество сохраненных точек
+        self.head = 0   # позиция следующей записи в кольцевом буфере
+
+    def __len__(self):
+        return self.size
+
+    def append(self, point: tuple):
+        """
+        Добавляет точку (time, value).
+        """
+        time, value = point
+        if self.capacity is None:
+            if self.size == len(self.times):
+                self._grow()
+            self.times[self.size] = time
+            self.values[self.size] = value
+            self.size += 1
+        else:
+            self.times[self.head] = time
+            self.values[self.head] = value
+            self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def _grow(self):
+        # рост не меньше половины текущего размера - append остается O(1) в среднем
+        extra = max(self.chunk_size, len(self.times) // 2)
+        for name in ("times", "values"):
+            column = getattr(self, name)
+            padding = array(column.typecode, bytes(column.itemsize * extra))
+            try:
+                column.extend(padding)
+            except BufferError:
+                # на массив ссылается представление из to_numpy - оно остается у старого массива
+                column = array(column.typecode, column)
+                column.extend(padding)
+                setattr(self, name, column)
+
+    def _wrapped(self) -> bool:
+        return self.capacity is not None and self.size == self.capacity and self.head != 0
+
+    def _position(self, i: int) -> int:
+        if self._wrapped():
+            return (self.head + i) % self.capacity
+        return i
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("MetricsBuffer index out of range")
+        position = self._position(index)
+        return self.times[position], self.values[position]
+
+    def __iter__(self):
+        times, values = self.columns()
+        return zip(times, values)
+
+    def columns(self):
+        """
+        Времена и значения в хронологическом порядке. Без копирования (memoryview),
+        если кольцевой буфер еще не перезаписывал старые точки.
+
+        :return: (times, values)
+        """
+        if self._wrapped():
+            return (self.times[self.head:] + self.times[:self.head],
+                    self.values[self.head:] + self.values[:self.head])
+        return memoryview(self.times)[:self.size], memoryview(self.values)[:self.size]
+
+    def to_numpy(self):
+        """
+        Представление истории массивами NumPy (без копирования, см. columns).
+
+        :return: (times, values)
+        """
+        import numpy as np
+        times, values = self.columns()
+        return np.asarray(times), np.asarray(values)
+
+    def clear(self):
+        self.size = 0
+        self.head = 0
+
+    def nbytes(self) -> int:
+        """
+        Память, занятая массивами буфера (байты).
+        """
+        return len(self.times) * self.times.itemsize + len(self.values) * self.values.itemsize
+
+
+
+class TimeWeightedAverage:
+    def __init__(self):
+        """
+        Среднее взвешенное по времени значение метрики, которое обновляется за O(1)
+        на каждую точку (time, value) - без хранения и повторного обхода истории.
+        Считает сразу два варианта: по всем точкам и только по точкам с ненулевым
+        значением (активная работа сервера), как в отчетах main.py.
+        """
+        # [сумма value * dt, сумма dt, время последней точки, значение последней точки]
+        self.all_time = [0, 0, None, None]
+        self.active_time = [0, 0, None, None]
+
+    @staticmethod
+    def _add(accumulator, time: float, value: float):
+        if accumulator[2] is not None:
+            delta_t = time - accumulator[2]   # Длительность интервала
+            accumulator[0] += accumulator[3] * delta_t  # Вклад в "время-задачи"
+            accumulator[1] += delta_t     # Вклад в общую длительность
+        accumulator[2] = time
+        accumulator[3] = value
+
+    def add(self, time: float, value: float):
+        """
+        Учитывает новую точку метрики.
+        """
+        self._add(self.all_time, time, value)
+        if value > 0:
+            self._add(self.active_time, time, value)
+
+    def average(self, active_only: bool = False, now: float = None):
+        """
+        Текущее среднее взвешенное.
+
+        :param active_only: Только по точкам с ненулевым значением.
+        :param now: Если задано - учитывается и интервал от последней точки до now
+                    (среднее "на сейчас" во время симуляции).
+        :return: Среднее взвешенное или 0, если нагрузки не было.
+        """
+        total_weighted, total_time, last_time, last_value = self.active_time if active_only else self.all_time
+        if now is not None and last_time is not None and now > last_time:
+            total_weighted += last_value * (now - last_time)
+            total_time += now - last_time
+
+        if total_weighted == 0:
+            return 0
+        return total_weighted / total_time
@@ -0,0 +1,40 @@
+import hashlib
+import random
+
+
+class SeedStream:
+    def __init__(self, seed: int, spawn_key: tuple = ()):
+        """
+        Дерево независимых seed (аналог numpy.random.SeedSequence).
+        Из одного seed запуска выводятся дочерние потоки для каждой ноды и
+        каждого устройства, поэтому результат не зависит от того, в каком процессе
+        и в каком порядке выполняются запуски.
+
+        :param seed: seed запуска.
+        :param spawn_key: Путь от корневого seed до этого потока.
+        """
+        self.seed = seed
+        self.spawn_key = tuple(spawn_key)
+        self._children_spawned = 0
+
+    def spawn(self, n: int) -> list:
+        """
+        Создает n новых независимых дочерних потоков.
+        Повторный вызов продолжает нумерацию, как SeedSequence.spawn.
+        """
+        start = self._children_spawned
+        self._children_spawned += n
+        return [SeedStream(self.seed, self.spawn_key + (i,)) for i in range(start, start + n)]
+
+    def entropy(self) -> int:
+        """
+        128-битное значение, полученное хешированием seed и пути.
+        """
+        key = "/".join(map(str, (self.seed,) + self.spawn_key)).encode()
+        return int.from_bytes(hashlib.sha256(key).digest()[:16], "little")
+
+    def generator(self) -> random.Random:
+        """
+        Генератор случайных чисел этого потока.
+        """
+        return random.Random(self.entropy())
@@ -0,0 +1,61 @@
+"""
+Повтор записанной трассы событий (event_trace) на нескольких алгоритмах распределения:
+каждый алгоритм получает одни и те же задачи в те же моменты виртуального времени
+и (по умолчанию) те же отказы нод, что и при записи.
+
+Трасса записывается при запуске main.py с trace_filename = "simulation.trace".
+
+Запуск:
+    python replay.py simulation.trace --algorithms RR WRR LC WLC
+    python replay.py simulation.trace --node-failures model --seed 2
+"""
+import argparse
+import logging
+import time
+
+from main import NODES_CONFIG, create_nodes, run_replay_simulation
+from event_trace import read_trace
+from random_streams import SeedStream
+from simulation_clock import VirtualClock
+from sweep import DISTRIBUTORS
+
+
+def replay(records, algorithm, nodes_config, replay_failures=True, seed=1):
+    """
+    Повторяет трассу на одном алгоритме.
+
+    :param records: Трасса (event_trace.read_trace).
+    :param algorithm: Имя алгоритма из sweep.DISTRIBUTORS.
+    :param replay_failures: Повторять записанные отказы нод, иначе - модель отказов с seed.
+    :return: (created, rejected, calculated) - количество задач.
+    """
+    nodes_seed_stream, _ = SeedStream(seed).spawn(2)
+    clock = VirtualClock()
+    nodes = create_nodes(nodes_config, clock, nodes_seed_stream)
+    distributor = DISTRIBUTORS[algorithm](nodes)
+    created = run_replay_simulation(nodes, records, distributor, clock, replay_failures=replay_failures)
+    return created, distributor.rejected_tasks, sum(node.done_tasks_count for node in nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="файл трассы")
+    parser.add_argument("--algorithms", nargs="+", default=["RR", "WRR", "LC", "WLC"], choices=list(DISTRIBUTORS))
+    parser.add_argument("--node-failures", choices=["trace", "model"], default="trace",
+                        help="отказы нод: из трассы или по модели отказов нод")
+    parser.add_argument("--seed", type=int, default=1, help="seed модели отказов (--node-failures model)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    records = read_trace(args.trace)
+
+    print(f"{'algorithm':<12}{'created':>10}{'rejected':>10}{'calculated':>12}{'seconds':>10}")
+    for algorithm in args.algorithms:
+        start = time.perf_counter()
+        created, rejected, calculated = replay(records, algorithm, NODES_CONFIG,
+                                               args.node_failures == "trace", args.seed)
+        print(f"{algorithm:<12}{created:>10}{rejected:>10}{calculated:>12}{time.perf_counter() - start:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import io
+import mmap
+import os
+import re
+import struct
+import zipfile
+from collections.abc import Mapping
+
+import numpy as np
+
+# таблицы результатов: имя метрики -> история ноды, из которой она строится
+METRICS = {
+    "load": "load_history",                     # загрузка вычислительной мощности (%)
+    "network_load": "network_load_history",     # загрузка сети (%)
+    "running_tasks": "running_tasks_history",   # количество задач на ноде
+}
+COLUMNS = ("node_id", "time", "value")
+
+# заголовок секции истории в simulation_results.csv: "Node 1 - Compute Load History"
+SECTION_PATTERN = re.compile(rb"^(Node [^\r\n]*)\r?\n([^\r\n]*)\r?\n", re.MULTILINE)
+
+
+def metric_table(nodes, history_name: str) -> dict:
+    """
+    Таблица метрики по всем нодам: колонки node_id, time, value (строки одной ноды идут подряд).
+
+    :param history_name: Имя атрибута истории ноды (см. METRICS).
+    :return: Словарь колонка -> массив NumPy.
+    """
+    columns = [getattr(node, history_name).to_numpy() for node in nodes]
+    lengths = [len(times) for times, _ in columns]
+    if not columns:
+        return {"node_id": np.empty(0, dtype=np.int64), "time": np.empty(0), "value": np.empty(0)}
+    return {
+        "node_id": np.repeat(np.array([node.node_id for node in nodes], dtype=np.int64), lengths),
+        "time": np.concatenate([times for times, _ in columns]),
+        "value": np.concatenate([values for _, values in columns]),
+    }
+
+
+def save_results(filename: str, nodes, total_created_tasks: int, total_rejected_tasks: int,
+                 simulation_duration: float, file_format: str = "npz"):
+    """
+    Сохраняет результаты симуляции в бинарном колоночном виде: по таблице
+    (node_id, time, value) на каждую метрику из METRICS и сводку запуска.
+
+    :param filename: Имя файла .npz или каталога (для формата "arrow").
+    :param file_format: "npz" - один несжатый файл NumPy, "arrow" - каталог с файлами
+                        Arrow IPC (Feather) по метрикам, нужен pyarrow.
+    """
+    tables = {metric: metric_table(nodes, history_name) for metric, history_name in METRICS.items()}
+    summary = {
+        "simulation_duration": np.array([simulation_duration], dtype=np.float64),
+        "total_created_tasks": np.array([total_created_tasks], dtype=np.int64),
+        "total_rejected_tasks": np.array([total_rejected_tasks], dtype=np.int64),
+    }
+    tables["summary"] = summary
+
+    if file_format == "npz":
+        # без сжатия: массивы лежат в архиве как есть и читаются через memmap
+        np.savez(filename, **{f"{table}/{column}": values
+                              for table, columns in tables.items() for column, values in columns.items()})
+    elif file_format == "arrow":
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            raise ImportError("file_format='arrow' requires pyarrow") from None
+        os.makedirs(filename, exist_ok=True)
+        for table, columns in tables.items():
+            feather.write_feather(pa.table(columns), os.path.join(filename, f"{table}.arrow"),
+                                  compression="uncompressed")
+    else:
+        raise ValueError(f"Unknown results format: {file_format}")
+
+
+def _memmap_npz(filename: str) -> dict:
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive, open(filename, "rb") as file:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{filename}: compressed arrays cannot be memory-mapped")
+            # данные члена архива идут за локальным заголовком zip и заголовком .npy
+            file.seek(info.header_offset)
+            name_length, extra_length = struct.unpack("<HH", file.read(30)[26:30])
+            file.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            name = info.filename[:-len(".npy")]
+            if np.prod(shape) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(filename, dtype=dtype, mode="r", offset=file.tell(), shape=shape,
+                                         order="F" if fortran_order else "C")
+    return arrays
+
+
+def load_results(filename: str, memory_map: bool = True) -> dict:
+    """
+    Загружает результаты, сохраненные save_results.
+
+    :param filename: Файл .npz или каталог с файлами Arrow.
+    :param memory_map: Отображать массивы в память, а не читать их целиком.
+    :return: Словарь таблица -> {колонка -> массив}: таблицы метрик из METRICS и "summary".
+    """
+    if os.path.isdir(filename):
+        import pyarrow.feather as feather
+        tables = {}
+        for name in os.listdir(filename):
+            if name.endswith(".arrow"):
+                table = feather.read_table(os.path.join(filename, name), memory_map=memory_map)
+                tables[name[:-len(".arrow")]] = {column: table[column].to_numpy() for column in table.column_names}
+        return tables
+
+    if memory_map:
+        arrays = _memmap_npz(filename)
+    else:
+        with np.load(filename) as data:
+            arrays = {name: data[name] for name in data.files}
+    tables = {}
+    for name, values in arrays.items():
+        table, column = name.split("/")
+        tables.setdefault(table, {})[column] = values
+    return tables
+
+
+def split_by_node(table: dict) -> dict:
+    """
+    Разбивает таблицу метрики на истории нод.
+
+    :return: Словарь node_id -> (times, values) - представления колонок без копирования.
+    """
+    node_ids = np.asarray(table["node_id"])
+    starts = np.flatnonzero(np.diff(node_ids)) + 1
+    bounds = np.concatenate(([0], starts, [len(node_ids)])) if len(node_ids) else np.zeros(1, dtype=np.int64)
+    return {int(node_ids[start]): (table["time"][start:end], table["value"][start:end])
+            for start, end in zip(bounds[:-1], bounds[1:])}
+
+
+def _parse_block(block: bytes, columns_count: int) -> np.ndarray:
+    if not block.strip():
+        return np.empty((0, columns_count))
+    return np.loadtxt(io.BytesIO(block), delimiter=",", ndmin=2)
+
+
+def _find_sections(data) -> list:
+    """
+    Заголовки секций истории. Строки секций ищутся по b"\\nNode " (быстрый поиск подстроки),
+    регулярное выражение проверяется только в найденных позициях, а не в каждой строке файла.
+    """
+    sections = []
+    if data[:5] == b"Node ":
+        sections.append(SECTION_PATTERN.match(data, 0))
+    position = data.find(b"\nNode ")
+    while position != -1:
+        sections.append(SECTION_PATTERN.match(data, position + 1))
+        position = data.find(b"\nNode ", position + 1)
+    return [section for section in sections if section is not None]
+
+
+class CsvSections(Mapping):
+    def __init__(self, data, sections: list):
+        """
+        Секции истории simulation_results.csv: {заголовок секции: {заголовок колонки: массив значений}}.
+        Числа секции разбираются при первом обращении к ней (одним вызовом np.loadtxt)
+        и запоминаются, поэтому секции, которые не нужны, не разбираются вовсе.
+
+        :param data: Содержимое файла (mmap); остается отображенным, пока существует объект.
+        :param sections: Совпадения SECTION_PATTERN в порядке файла.
+        """
+        self.data = data
+        self.spans = {}     # заголовок секции -> (заголовки колонок, начало, конец данных)
+        for section, next_section in zip(sections, sections[1:] + [None]):
+            end = next_section.start() if next_section is not None else len(data)
+            self.spans[section.group(1).decode()] = (section.group(2).decode().split(","), section.end(), end)
+        self.columns = {}
+
+    def __getitem__(self, name):
+        columns = self.columns.get(name)
+        if columns is None:
+            headers, start, end = self.spans[name]
+            rows = _parse_block(self.data[start:end], len(headers))
+            columns = self.columns[name] = {header: rows[:, i] for i, header in enumerate(headers)}
+        return columns
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+
+def load_simulation_csv(filename: str = "simulation_results.csv"):
+    """
+    Читает результаты в секционном формате save_results_to_csv (main.py): файл отображается
+    в память, заголовки секций находятся поиском подстроки, а числа секции разбираются
+    при первом обращении к ней (CsvSections).
+
+    :return: (summary, node_data): summary - словарь из первых двух строк файла
+             ("Simulation Duration", "Total Created Tasks", "Total Rejected Tasks"),
+             node_data - CsvSections, {заголовок секции: {заголовок колонки: массив значений}}.
+    """
+    with open(filename, "rb") as file:
+        # отображение не зависит от дескриптора файла и живет вместе с CsvSections
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    sections = _find_sections(data)
+
+    summary_end = sections[0].start() if sections else len(data)
+    lines = data[:summary_end].decode().splitlines()
+    summary = dict(zip(lines[0].split(","), map(float, lines[1].split(",")))) if len(lines) >= 2 else {}
+    return summary, CsvSections(data, sections)
+
+
+def load_node_results_csv(filename: str = "node_results.csv") -> dict:
+    """
+    Читает node_results.csv (save_data_to_csv в main.py) через отображение файла в память.
+
+    :return: Словарь заголовок колонки -> массив значений.
+    """
+    with open(filename, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header_end = data.find(b"\n") + 1
+        headers = data[:header_end].decode().strip().split(",")
+        rows = _parse_block(data[header_end:], len(headers))
+    return {header: rows[:, i] for i, header in enumerate(headers)}
@@ -0,0 +1,392 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import threading
+import time
+
+
+class RealTimeClock:
+    def __init__(self):
+        """
+        Часы реального времени: каждый процесс выполняется в отдельном потоке,
+        задержки реализуются через time.sleep. Отложенные вызовы (call_later) выполняет
+        один общий поток таймеров (создается при первом вызове), а не поток на вызов.
+        """
+        self._timers = []   # [(deadline, seq, callback, args)]
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._timer_thread = None
+
+    def now(self) -> float:
+        return time.time()
+
+    def sleep(self, delay: float):
+        time.sleep(delay)
+
+    def call_later(self, delay: float, callback, *args):
+        """
+        Вызывает callback(*args) через delay секунд.
+        """
+        event = [time.time() + delay, next(self._sequence), callback, args]
+        with self._condition:
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._run_timers, name="real-time-timers",
+                                                      daemon=True)
+                self._timer_thread.start()
+            heapq.heappush(self._timers, event)
+            # будим поток таймеров, только если новое событие стало ближайшим
+            if self._timers[0] is event:
+                self._condition.notify()
+        return event
+
+    @staticmethod
+    def cancel(event):
+        """
+        Отменяет запланированный вызов.
+        """
+        event[2] = None
+
+    def _run_timers(self):
+        timers = self._timers
+        condition = self._condition
+        while True:
+            with condition:
+                while True:
+                    if not timers:
+                        condition.wait()
+                        continue
+                    timeout = timers[0][0] - time.time()
+                    if timeout <= 0:
+                        break
+                    condition.wait(timeout)
+                _, _, callback, args = heapq.heappop(timers)
+
+            if callback is None:
+                continue
+            # ошибка одного вызова не должна останавливать поток таймеров
+            try:
+                callback(*args)
+            except Exception:
+                logging.exception("Real-time clock: callback %s failed", callback)
+
+    def start_process(self, process, daemon: bool = False):
+        """
+        Запускает процесс - генератор, который отдает (yield) задержки в секундах.
+
+        :param process: Генератор процесса.
+        :param daemon: Запускать ли поток процесса как daemon.
+        """
+        thread = threading.Thread(target=self._run_process, args=(process,), daemon=daemon)
+        thread.start()
+        return thread
+
+    def _run_process(self, process):
+        for delay in process:
+            time.sleep(delay)
+
+
+class VirtualClock:
+    def __init__(self, start_time: float = 0.0):
+        """
+        Часы виртуального времени для дискретно-событийной симуляции.
+        События хранятся в календаре (min-heap) и выполняются по порядку,
+        время перескакивает сразу к следующему событию.
+
+        :param start_time: Начальное виртуальное время (в секундах).
+        """
+        self.current_time = start_time
+        self._calendar = []     # [(time, seq, callback, args)]
+        self._sequence = itertools.count()  # для детерминированного порядка одновременных событий
+
+    def now(self) -> float:
+        return self.current_time
+
+    def sleep(self, delay: float):
+        """
+        В виртуальном времени ждать нечего - время двигает только run().
+        """
+
+    def call_at(self, event_time: float, callback, *args):
+        """
+        Планирует вызов callback(*args) на момент event_time.
+        """
+        event = [event_time, next(self._sequence), callback, args]
+        heapq.heappush(self._calendar, event)
+        return event
+
+    def call_later(self, delay: float, callback, *args):
+        """
+        Планирует вызов callback(*args) через delay секунд виртуального времени.
+        """
+        return self.call_at(self.current_time + delay, callback, *args)
+
+    @staticmethod
+    def cancel(event):
+        """
+        Отменяет запланированное событие.
+        """
+        event[2] = None
+
+    def start_process(self, process, daemon: bool = False):
+        """
+        Запускает процесс - генератор, который отдает (yield) задержки в секундах.
+        Первый шаг процесса выполняется сразу.
+
+        :param process: Генератор процесса.
+        :param daemon: Не используется, оставлен для совместимости с RealTimeClock.
+        """
+        self._step_process(process)
+        return process
+
+    def _step_process(self, process):
+        try:
+            delay = next(process)
+        except StopIteration:
+            return
+        self.call_later(delay, self._step_process, process)
+
+    def run(self, until: float = None):
+        """
+        Выполняет события календаря до момента until (или пока календарь не опустеет).
+
+        :param until: Виртуальное время окончания.
+        """
+        calendar = self._calendar
+        while calendar:
+            if until is not None and calendar[0][0] > until:
+                break
+            event_time, _, callback, args = heapq.heappop(calendar)
+            self.current_time = event_time
+            if callback is not None:
+                callback(*args)
+
+        if until is not None and self.current_time < until:
+            self.current_time = until
+
+    def pending_events(self) -> int:
+        return len(self._calendar)
+
+
+class TimerHeapClock:
+    def __init__(self, workers: int = 0):
+        """
+        Часы реального времени с одним потоком-планировщиком. Этапы всех процессов
+        хранятся в min-heap по времени пробуждения, поэтому число потоков не зависит
+        от количества выполняемых задач.
+
+        :param workers: Размер пула потоков для выполнения шагов процессов.
+                        0 - шаги выполняются в потоке планировщика.
+        """
+        self._heap = []     # [(deadline, seq, callback, args)]
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running_processes = 0     # не-daemon процессы, которые еще не завершились
+        self._pool = None
+        if workers > 0:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="timer-heap-worker")
+
+        # Статистика опозданий пробуждения (scheduling jitter)
+        self.events_count = 0
+        self.total_lateness = 0.0
+        self.max_lateness = 0.0
+
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="timer-heap", daemon=True)
+        self._thread.start()
+
+    def now(self) -> float:
+        return time.time()
+
+    def sleep(self, delay: float):
+        time.sleep(delay)
+
+    def call_at(self, deadline: float, callback, *args):
+        """
+        Планирует вызов callback(*args) на момент deadline (time.time()).
+        """
+        event = [deadline, next(self._sequence), callback, args]
+        with self._condition:
+            heapq.heappush(self._heap, event)
+            # будим планировщик, только если новое событие стало ближайшим
+            if self._heap[0] is event:
+                self._condition.notify()
+        return event
+
+    def call_later(self, delay: float, callback, *args):
+        """
+        Вызывает callback(*args) через delay секунд.
+        """
+        return self.call_at(time.time() + delay, callback, *args)
+
+    @staticmethod
+    def cancel(event):
+        """
+        Отменяет запланированное событие.
+        """
+        event[2] = None
+
+    def start_process(self, process, daemon: bool = False):
+        """
+        Запускает процесс - генератор, который отдает (yield) задержки в секундах.
+
+        :param process: Генератор процесса.
+        :param daemon: daemon-процессы не учитываются в wait().
+        """
+        if not daemon:
+            with self._condition:
+                self._running_processes += 1
+        self.call_at(time.time(), self._step_process, process, daemon)
+        return process
+
+    def _step_process(self, process, daemon):
+        try:
+            delay = next(process)
+        except Exception as error:
+            # процесс с ошибкой завершается, как поток процесса у RealTimeClock
+            if not isinstance(error, StopIteration):
+                logging.exception("Timer heap clock: process %s failed", process)
+            if not daemon:
+                with self._condition:
+                    self._running_processes -= 1
+                    self._condition.notify_all()
+            return
+        self.call_later(delay, self._step_process, process, daemon)
+
+    @staticmethod
+    def _call(callback, args):
+        # ошибка одного события не должна останавливать планировщик
+        try:
+            callback(*args)
+        except Exception:
+            logging.exception("Timer heap clock: callback %s failed", callback)
+
+    def _run(self):
+        heap = self._heap
+        condition = self._condition
+        while True:
+            with condition:
+                while not self._stopped:
+                    if not heap:
+                        condition.wait()
+                        continue
+                    timeout = heap[0][0] - time.time()
+                    if timeout <= 0:
+                        break
+                    condition.wait(timeout)
+                if self._stopped:
+                    return
+                deadline, _, callback, args = heapq.heappop(heap)
+
+            if callback is None:
+                continue
+
+            lateness = time.time() - deadline
+            self.events_count += 1
+            self.total_lateness += lateness
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+
+            if self._pool is not None:
+                self._pool.submit(self._call, callback, args)
+            else:
+                self._call(callback, args)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Ждет завершения всех не-daemon процессов.
+
+        :return: True, если все процессы завершились до timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._running_processes == 0, timeout)
+
+    def stop(self):
+        """
+        Останавливает поток планировщика и пул потоков.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+class AsyncioClock:
+    def __init__(self):
+        """
+        Часы реального времени на asyncio: этапы задач выполняются как
+        await asyncio.sleep на одном event loop, без отдельных потоков.
+        Процесс может отдавать (yield) не только задержку, но и awaitable
+        (например, реальную асинхронную операцию ввода-вывода) - результат
+        await возвращается обратно в генератор.
+
+        Методы, планирующие работу, нужно вызывать из работающего event loop.
+        """
+        self._tasks = set()     # не-daemon процессы, которые еще выполняются
+
+    def now(self) -> float:
+        return time.time()
+
+    def sleep(self, delay: float):
+        """
+        Блокирующее ожидание в event loop недопустимо - используйте await asyncio.sleep.
+        """
+        raise RuntimeError("AsyncioClock.sleep is not supported, use 'await asyncio.sleep(...)'")
+
+    def call_later(self, delay: float, callback, *args):
+        """
+        Вызывает callback(*args) через delay секунд.
+        """
+        return asyncio.get_running_loop().call_later(delay, callback, *args)
+
+    @staticmethod
+    def cancel(event):
+        """
+        Отменяет запланированное событие.
+        """
+        event.cancel()
+
+    def start_process(self, process, daemon: bool = False):
+        """
+        Запускает процесс - генератор, который отдает (yield) задержки в секундах или awaitable.
+
+        :param process: Генератор процесса.
+        :param daemon: daemon-процессы не учитываются в wait().
+        """
+        task = asyncio.get_running_loop().create_task(self._run_process(process))
+        if not daemon:
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return task
+
+    @staticmethod
+    async def _run_process(process):
+        result = None
+        while True:
+            try:
+                step = process.send(result)
+            except StopIteration:
+                return
+            if inspect.isawaitable(step):
+                result = await step
+            else:
+                await asyncio.sleep(step)
+                result = None
+
+    async def wait(self, timeout: float = None) -> bool:
+        """
+        Ждет завершения всех не-daemon процессов.
+
+        :return: True, если все процессы завершились до timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while self._tasks:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            await asyncio.wait(list(self._tasks), timeout=remaining)
+        return True
@@ -0,0 +1,164 @@
+"""
+Параллельный перебор параметров симуляции: алгоритмы распределения x конфигурации нод
+x нагрузки edge-устройств x seed. Каждый запуск выполняется в виртуальном времени
+в отдельном процессе ProcessPoolExecutor и сохраняет свои node_results.csv и
+simulation_results.npz (истории метрик, см. results_io.py) в
+<output>/<конфигурация>/<нагрузка>/<алгоритм>/seed_<seed>/. В конце все результаты
+собираются в одну таблицу <output>/sweep_results.csv.
+
+Запуск:
+    python sweep.py --algorithms RR WRR LC WLC --seeds 1 2 3 --duration 15
+    python sweep.py --grid grid.json --workers 8
+
+grid.json (необязательный) задает свои конфигурации нод и нагрузки:
+    {"node_configurations": {"configuration_2": [{"node_id": 1, ...}, ...]},
+     "workloads": {"light": [{"device_id": 1, ...}, ...]}}
+"""
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main import (NODES_CONFIG, DEVICES_CONFIG, create_nodes, create_devices,
+                  run_virtual_simulation, save_data_to_csv)
+from results_io import save_results
+from simulation_clock import VirtualClock
+from random_streams import SeedStream
+from task_distributor import (RoundRobin, WeightedRoundRobin, SmoothWeightedRoundRobin,
+                              LeastConnection, WeightedLeastConnection)
+
+DISTRIBUTORS = {
+    "RR": RoundRobin,
+    "WRR": WeightedRoundRobin,
+    "SWRR": SmoothWeightedRoundRobin,
+    "LC": LeastConnection,
+    "WLC": WeightedLeastConnection,
+}
+
+NODE_CONFIGURATIONS = {"configuration_1": NODES_CONFIG}
+WORKLOADS = {"default": DEVICES_CONFIG}
+
+RESULT_FIELDS = ["Configuration", "Workload", "Algorithm", "Seed",
+                 "Total Created Tasks", "Total Rejected Tasks", "Total Calculated Tasks (run)",
+                 "Node", "Weighted Load (%)", "Weighted Network Load (%)",
+                 "Weighted Tasks Load (pieces)", "Total Calculated Tasks"]
+
+
+def run_single(job):
+    """
+    Один запуск симуляции (выполняется в процессе-воркере).
+
+    :param job: Словарь с параметрами запуска.
+    :return: Список строк результата (по одной на ноду).
+    """
+    # логи в воркерах отключены, иначе запуски пишут друг другу в один файл
+    logging.disable(logging.CRITICAL)
+
+    output_dir = job["output_dir"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Все случайные величины выводятся из seed запуска: одинаковый seed дает
+    # одинаковые отказы нод для всех алгоритмов (common random numbers)
+    nodes_seed_stream, devices_seed_stream = SeedStream(job["seed"]).spawn(2)
+    clock = VirtualClock()
+    nodes = create_nodes(job["nodes_config"], clock, nodes_seed_stream)
+    devices = create_devices(job["devices_config"], clock, devices_seed_stream)
+    distributor = DISTRIBUTORS[job["algorithm"]](nodes)
+
+    total_created_tasks = run_virtual_simulation(nodes, devices, distributor, job["duration"], clock)
+    node_data = save_data_to_csv(nodes, filename=os.path.join(output_dir, "node_results.csv"), verbose=False)
+    save_results(os.path.join(output_dir, "simulation_results.npz"), nodes, total_created_tasks,
+                 distributor.rejected_tasks, job["duration"])
+
+    run_info = {
+        "Configuration": job["configuration"],
+        "Workload": job["workload"],
+        "Algorithm": job["algorithm"],
+        "Seed": job["seed"],
+        "Total Created Tasks": total_created_tasks,
+        "Total Rejected Tasks": distributor.rejected_tasks,
+        "Total Calculated Tasks (run)": sum(node.done_tasks_count for node in nodes),
+    }
+    return [dict(run_info, **row) for row in node_data]
+
+
+def build_jobs(node_configurations, workloads, algorithms, seeds, duration, output_root):
+    """
+    Строит декартово произведение параметров перебора.
+    """
+    jobs = []
+    for (config_name, nodes_config), (workload_name, devices_config), algorithm, seed in itertools.product(
+            node_configurations.items(), workloads.items(), algorithms, seeds):
+        jobs.append({
+            "configuration": config_name,
+            "nodes_config": nodes_config,
+            "workload": workload_name,
+            "devices_config": devices_config,
+            "algorithm": algorithm,
+            "seed": seed,
+            "duration": duration,
+            "output_dir": os.path.join(output_root, config_name, workload_name, algorithm, f"seed_{seed}"),
+        })
+    return jobs
+
+
+def run_sweep(jobs, workers=None):
+    """
+    Выполняет запуски на всех ядрах и возвращает строки результатов
+    в порядке перебора (не в порядке завершения).
+    """
+    if workers == 0:
+        # последовательный запуск в текущем процессе (для проверки воспроизводимости)
+        return [row for job in jobs for row in run_single(job)]
+
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_single, job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            print(f"[{done}/{len(jobs)}] done")
+    return [row for rows in results for row in rows]
+
+
+def save_sweep_results(rows, filename):
+    with open(filename, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", default=["RR", "WRR", "LC", "WLC"], choices=list(DISTRIBUTORS))
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1])
+    parser.add_argument("--duration", type=float, default=15, help="длительность симуляции (сек)")
+    parser.add_argument("--grid", help="JSON с node_configurations и/или workloads")
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов (по умолчанию - все ядра, 0 - последовательно)")
+    parser.add_argument("--output", default=os.path.join("results", "sweep"), help="папка для результатов")
+    args = parser.parse_args()
+
+    node_configurations = NODE_CONFIGURATIONS
+    workloads = WORKLOADS
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as file:
+            grid = json.load(file)
+        node_configurations = grid.get("node_configurations", node_configurations)
+        workloads = grid.get("workloads", workloads)
+
+    jobs = build_jobs(node_configurations, workloads, args.algorithms, args.seeds, args.duration, args.output)
+    print(f"Sweep: {len(jobs)} runs")
+
+    start = time.time()
+    rows = run_sweep(jobs, args.workers)
+
+    filename = os.path.join(args.output, "sweep_results.csv")
+    save_sweep_results(rows, filename)
+    print(f"Результаты перебора сохранены в файл: {filename} ({time.time() - start:.2f} сек)")
+
+
+if __name__ == "__main__":
+    main()
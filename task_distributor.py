@@ -1,26 +1,224 @@
+import heapq
+import inspect
 import logging
+import threading
+import math
+
+from cluster_index import IndexedMinHeap, CapacityIndex
+
+
+def reserve_candidate(nodes: list, find_candidate, task_compute_demand: float, task_data_size: float):
+    """
+    Резервирует ресурсы под задачу на первой подходящей ноде.
+    Индексы дистрибьюторов - подсказка: если между выбором ноды и резервированием
+    ресурсы ноды заняли (другой поток), пробуется следующий кандидат.
+
+    :param nodes: Список нод.
+    :param find_candidate: Функция find_candidate(tried) -> номер ноды-кандидата
+                           (кроме нод из tried) или None.
+    :return: (номер ноды, TaskReservation) или (None, None), если задачу некуда отдать.
+    """
+    tried = set()
+    while True:
+        i = find_candidate(tried)
+        if i is None:
+            return None, None
+        reservation = nodes[i].try_reserve(task_compute_demand, task_data_size)
+        if reservation is not None:
+            return i, reservation
+        tried.add(i)
+
+
+class BatchPlan:
+    def __init__(self, nodes: list):
+        """
+        План распределения пакета задач. Состояние ноды копируется один раз - при первом
+        назначении ей задачи из пакета, дальше назначения учитываются в этой локальной копии
+        без блокировок нод. Ресурсы резервируются на нодах вместе в commit.
+
+        :param nodes: Список нод.
+        """
+        self.nodes = nodes
+        self.states = {}        # номер ноды -> [свободные FLOPS, свободная пропускная способность, количество задач]
+        self.assignments = []   # [(номер задачи в пакете, номер ноды)] в порядке пакета
+
+    def fits(self, i: int, task_compute_demand: float, task_data_size: float) -> bool:
+        free_flops, free_bandwidth, _ = self.states[i]
+        return free_flops >= task_compute_demand and free_bandwidth >= task_data_size
+
+    def unfit(self, task_compute_demand: float, task_data_size: float) -> set:
+        """
+        Ноды, которые уже получили задачи пакета и больше не могут принять эту задачу.
+        """
+        return {i for i in self.states if not self.fits(i, task_compute_demand, task_data_size)}
+
+    def tasks_count(self, i: int) -> int:
+        return self.states[i][2]
+
+    def assign(self, position: int, i: int, task_compute_demand: float, task_data_size: float):
+        """
+        Назначает задачу position пакета ноде i.
+        """
+        if i not in self.states:
+            node = self.nodes[i]
+            self.states[i] = [*CapacityIndex.free_resources(node), node.get_current_tasks_on_node()]
+        state = self.states[i]
+        state[0] -= task_compute_demand
+        state[1] -= task_data_size
+        state[2] += 1
+        self.assignments.append((position, i))
+
+    def commit(self, tasks: list):
+        """
+        Резервирует ресурсы под назначенные задачи (одна блокировка на ноду)
+        и запускает задачи в порядке пакета.
+
+        :param tasks: Пакет задач [(task_compute_demand, task_data_size, task_id[, arrival_time])].
+        :return: (список нод по задачам пакета, номера задач, которым при резервировании не хватило ресурсов)
+        """
+        positions_by_node = {}
+        for position, i in self.assignments:
+            positions_by_node.setdefault(i, []).append(position)
+
+        reservations = {}
+        for i, positions in positions_by_node.items():
+            node_reservations = self.nodes[i].try_reserve_many([tasks[position][:2] for position in positions])
+            reservations.update(zip(positions, node_reservations))
+
+        assigned = [None] * len(tasks)
+        failed = []
+        for position, i in self.assignments:
+            if reservations[position] is None:
+                failed.append(position)
+                continue
+            self.nodes[i].start_task(reservations[position], *tasks[position][2:])
+            assigned[position] = self.nodes[i]
+        return assigned, failed
+
+
+def find_min_planned(heap: IndexedMinHeap, capacity_index: CapacityIndex, plan: BatchPlan,
+                     task_compute_demand: float, task_data_size: float):
+    """
+    Нода с минимальным ключом кучи, которая может принять задачу, с учетом плана пакета:
+    свободные ресурсы нод с задачами пакета берутся из локальной копии, остальных - из индекса.
+    Ключи нод с задачами пакета дистрибьютор обновляет в куче сразу при назначении.
+
+    :return: Номер ноды или None.
+    """
+    # план только уменьшает свободные ресурсы: если по индексу не подходит ни одна нода,
+    # обход кучи не нужен (иначе он проверил бы все ноды)
+    if capacity_index.find_first(task_compute_demand, task_data_size) is None:
+        return None
+    return heap.find_min(lambda i: plan.fits(i, task_compute_demand, task_data_size) if i in plan.states
+                         else capacity_index.fits(i, task_compute_demand, task_data_size))
+
+
+def normalize_weights(weights: list) -> list:
+    """
+    Нормализует веса нод в диапазон от 1 до 10 (чем больше вес, тем лучше нода).
+    Если все веса равны (в том числе у единственной ноды), все нормализованные веса равны 1.
+    """
+    max_weight = max(weights)
+    min_weight = min(weights)
+    if max_weight == min_weight:
+        return [1.0] * len(weights)
+    return [1 + 9 * ((weight - min_weight) / (max_weight - min_weight)) for weight in weights]
+
+
+def check_cluster_state(nodes: list, cluster_state):
+    """
+    Проверяет, что ClusterState построен из тех же нод в том же порядке.
+    """
+    if cluster_state is not None and cluster_state.nodes != list(nodes):
+        raise ValueError("cluster_state must be built from the distributor nodes in the same order")
+
+
+def task_distribution(distributor):
+    """
+    Функция, которая передает задачу (task_compute_demand, task_data_size, task_id[, arrival_time])
+    дистрибьютору. arrival_time передается по имени и только если distribute_task его принимает,
+    поэтому драйверы работают и с дистрибьюторами с интерфейсом distribute_task(demand, size, task_id).
+
+    :return: Функция distribute(task) -> нода, получившая задачу, или None.
+    """
+    distribute_task = distributor.distribute_task
+    try:
+        parameters = inspect.signature(distribute_task).parameters.values()
+    except (TypeError, ValueError):
+        parameters = ()
+    if not any(parameter.name == "arrival_time" or parameter.kind is parameter.VAR_KEYWORD
+               for parameter in parameters):
+        return lambda task: distribute_task(*task[:3])
+
+    def distribute(task):
+        if len(task) > 3:
+            return distribute_task(*task[:3], arrival_time=task[3])
+        return distribute_task(*task)
+    return distribute
+
+
+def finish_batch(distributor, plan: BatchPlan, tasks: list, rejected_count: int) -> list:
+    """
+    Фиксирует план пакета. Задачи, которым при резервировании не хватило ресурсов
+    (ноду успел занять другой поток), распределяются по одной через distribute_task.
+
+    :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+    """
+    assigned, failed = plan.commit(tasks)
+
+    # ключи из плана у нод, где резервирование не удалось, заменяем фактическим состоянием
+    on_node_changed = getattr(distributor, "on_node_changed", None)
+    if on_node_changed is not None:
+        for i in {i for position, i in plan.assignments if assigned[position] is None}:
+            on_node_changed(plan.nodes[i])
+
+    for position in failed:
+        assigned[position] = distributor.distribute_task(*tasks[position])
+    if rejected_count:
+        with distributor.lock:
+            distributor.rejected_tasks += rejected_count
+    return assigned
 
 
 class WeightedRoundRobin:
-    def __init__(self, nodes: list):
+    def __init__(self, nodes: list, cluster_state=None):
         """
-        Класс для распределения задач между нодами по алгоритму Round Robin.
+        Класс для распределения задач между нодами по алгоритму Weighted Round Robin.
+        Веса нод вычисляются один раз и пересчитываются только при изменении
+        параметров нод или состава кластера (add_node / remove_node).
 
         :param nodes: Список нод.
+        :param cluster_state: ClusterState этих же нод (необязательно). Если задан, нода выбирается
+                              векторным выражением по массивам кластера, а не по индексам.
         """
-        self.nodes = nodes
+        self.nodes = list(nodes)
+        self.cluster_state = cluster_state
         self.current_node_index = 0
         self.rejected_tasks = 0  # Счетчик отклоненных задач
+        self.lock = threading.Lock()    # для одновременной работы нескольких диспетчеров
         self.nodes_weights = [0.0] * len(nodes)
         self.normalized_nodes_weights = [0.0] * len(nodes)
 
+        self.weights_valid = False  # нужно ли пересчитать веса
+        self.weight_order = []      # индексы нод по убыванию веса
+        self.capacity_index = None  # индекс свободных ресурсов нод в порядке weight_order
+        self.weight_order_array = None  # weight_order массивом NumPy (при cluster_state)
+        self.nodes_params = {}      # параметры нод, по которым посчитаны веса
+        self.node_indices = {}
+        self.eligible_nodes = set()     # индексы доступных (не отключенных) нод
+        for node in self.nodes:
+            node.subscribe(self.on_node_changed)
+        self.update_membership()
+
+    @staticmethod
+    def node_params(node):
+        return (node.compute_power_flops, node.delay_seconds,
+                node.bandwidth_bytes, node.failure_probability)
+
     def calc_node_weights(self, nodes):
         '''Вычисляем вес нод'''
         for i in range(len(nodes)):
-            flops, delay, bandwidth, fp = (nodes[i].compute_power_flops,
-                                           nodes[i].delay_seconds,
-                                           nodes[i].bandwidth_bytes,
-                                           nodes[i].failure_probability)
+            flops, delay, bandwidth, fp = self.node_params(nodes[i])
             w = (flops + bandwidth) / (delay * 1000 + fp)
             self.nodes_weights[i] = w
 
@@ -30,153 +228,501 @@ class WeightedRoundRobin:
 
         # Перещитываем веса
         self.calc_node_weights(self.nodes)
-
-        max_weight = max(self.nodes_weights)
-        min_weight = min(self.nodes_weights)
-        for i in range(len(self.nodes_weights)):
-            normalized_weight = 1 + 9 * ((self.nodes_weights[i] - min_weight) / (max_weight - min_weight))
-            self.normalized_nodes_weights[i] = normalized_weight
-
-    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+        self.normalized_nodes_weights = normalize_weights(self.nodes_weights)
+
+        # порядок обхода: по убыванию веса, при равенстве - первая по порядку
+        self.weight_order = sorted(range(len(self.nodes)), key=lambda i: (-self.normalized_nodes_weights[i], i))
+        self.nodes_params = {node: self.node_params(node) for node in self.nodes}
+        self.build_index()
+        self.weights_valid = True
+
+    def build_index(self):
+        '''Строим индекс свободных ресурсов в порядке убывания веса'''
+        if self.cluster_state is not None:
+            import numpy as np
+            self.weight_order_array = np.asarray(self.weight_order)
+        else:
+            self.capacity_index = CapacityIndex(self.nodes, self.weight_order)
+
+    def update_membership(self):
+        '''Пересобираем индексы нод после изменения состава кластера'''
+        check_cluster_state(self.nodes, self.cluster_state)
+        self.node_indices = {node: i for i, node in enumerate(self.nodes)}
+        self.nodes_weights = [0.0] * len(self.nodes)
+        self.normalized_nodes_weights = [0.0] * len(self.nodes)
+        self.eligible_nodes = {i for i, node in enumerate(self.nodes) if node.is_available()}
+        self.weights_valid = False
+
+    def add_node(self, node):
+        '''Добавляет ноду в кластер'''
+        self.nodes.append(node)
+        node.subscribe(self.on_node_changed)
+        self.update_membership()
+
+    def remove_node(self, node):
+        '''Удаляет ноду из кластера'''
+        self.nodes.remove(node)
+        node.unsubscribe(self.on_node_changed)
+        self.update_membership()
+
+    def on_node_changed(self, node):
+        '''Вызывается нодой при изменении состояния: обновляем доступность и индекс,
+        а при изменении параметров ноды помечаем веса для пересчета'''
+        i = self.node_indices[node]
+        if node.is_available():
+            self.eligible_nodes.add(i)
+        else:
+            self.eligible_nodes.discard(i)
+        if self.weights_valid and self.nodes_params.get(node) != self.node_params(node):
+            self.weights_valid = False
+        if self.cluster_state is None:
+            # индекс строится и пересобирается под self.lock (ensure_weights): уведомление попадает
+            # либо в старый индекс до замены, либо в новый - и не теряется, пока веса пересчитываются
+            with self.lock:
+                capacity_index = self.capacity_index
+                # новая нода (или первая сборка индекса) прочитает текущее состояние при сборке
+                if capacity_index is not None and node in capacity_index.positions:
+                    capacity_index.update(node)
+
+    def node_fits(self, i: int, task_compute_demand: float, task_data_size: float) -> bool:
+        '''Может ли нода i принять задачу (по массивам кластера или по индексу)'''
+        if self.cluster_state is not None:
+            return self.cluster_state.fits(i, task_compute_demand, task_data_size)
+        return self.capacity_index.fits(i, task_compute_demand, task_data_size)
+
+    def find_node(self, task_compute_demand: float, task_data_size: float, exclude=()):
+        '''Первая по убыванию веса доступная нода, которая может принять задачу'''
+        if self.cluster_state is not None:
+            return self.cluster_state.first_feasible(task_compute_demand, task_data_size,
+                                                     order=self.weight_order_array, exclude=exclude)
+        return self.capacity_index.find_first(task_compute_demand, task_data_size, exclude=exclude)
+
+    def ensure_weights(self):
+        '''Пересчитываем веса, если они устарели (один раз, даже если
+        задачи распределяют несколько диспетчеров одновременно)'''
+        if not self.weights_valid:
+            with self.lock:
+                if not self.weights_valid:
+                    self.normalize_node_weights()
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
         """
-        Распределяет задачу между нодами по алгоритму Round Robin.
+        Распределяет задачу между нодами по алгоритму Weighted Round Robin:
+        задача отдается доступной ноде с наивысшим весом, которая может ее принять.
 
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
         :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (по умолчанию - момент передачи ноде).
+        :return: Нода, получившая задачу, или None, если задача отклонена.
         """
-#
-        # перещитываем веса нод
-        self.normalize_node_weights()
+        self.ensure_weights()
+
+        # Первая по убыванию веса доступная нода, которая может принять задачу
+        i, reservation = reserve_candidate(
+            self.nodes,
+            lambda tried: self.find_node(task_compute_demand, task_data_size, exclude=tried),
+            task_compute_demand, task_data_size)
+
+        if reservation is None:
+            # Если все ноды отключены или заняты то пропускаем
+            logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+            with self.lock:
+                self.rejected_tasks += 1
+            return
+
+        # отдаем задачу
+        self.nodes[i].start_task(reservation, task_id, arrival_time)
+        logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[i].node_id)
+        return self.nodes[i]
 
-        for i in range(len(self.nodes)):
-            '''Проверяем доступна ли нода и может ли принять задачу,
-            после этого смотрим на веса оставшихся нод и выбираем с наивысшим весом
-            Недоступным нодам делаем вес равный нулю'''
-            if self.nodes[i].is_available() and self.nodes[i].can_accept_task(task_compute_demand, task_data_size):
+    def distribute_tasks(self, tasks: list) -> list:
+        """
+        Распределяет пакет задач (например, все задачи одного такта) по алгоритму Weighted Round Robin.
+        Ноды для всего пакета выбираются по индексам и локальной копии состояния
+        затронутых нод (BatchPlan), затем ресурсы резервируются одной блокировкой на ноду.
+
+        :param tasks: Список задач (task_compute_demand, task_data_size, task_id[, arrival_time]).
+        :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+        """
+        self.ensure_weights()
+
+        plan = BatchPlan(self.nodes)
+        rejected_count = 0
+        for position, task in enumerate(tasks):
+            task_compute_demand, task_data_size, task_id = task[:3]
+            i = self.find_node(task_compute_demand, task_data_size,
+                               exclude=plan.unfit(task_compute_demand, task_data_size))
+            if i is None:
+                logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+                rejected_count += 1
                 continue
-            else:
-                self.normalized_nodes_weights[i] = 0
+            plan.assign(position, i, task_compute_demand, task_data_size)
+            logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[i].node_id)
+
+        return finish_batch(self, plan, tasks, rejected_count)
+
+
+class SmoothWeightedRoundRobin(WeightedRoundRobin):
+    def __init__(self, nodes: list, cluster_state=None):
+        """
+        Класс для распределения задач между нодами по алгоритму Smooth Weighted Round Robin.
+        Задачи чередуются между нодами пропорционально весам (та же формула, что в
+        WeightedRoundRobin), а не отдаются самой сильной ноде до ее заполнения.
+        Расписание цикла строится один раз при пересчете весов. Индекс свободных ресурсов
+        построен по слотам расписания, поэтому занятые и недоступные ноды пропускаются
+        за O(log длины расписания), без обхода слотов по одному.
 
+        :param nodes: Список нод.
+        :param cluster_state: ClusterState этих же нод (необязательно). Если задан, нода выбирается
+                              векторным выражением по массивам кластера, а не по индексам.
+        """
+        self.schedule = []  # цикл расписания: индексы нод, каждая встречается integer_weight раз
+        self.schedule_array = None  # schedule массивом NumPy (при cluster_state)
+        self.cursors = threading.local()    # позиция в расписании своя у каждого потока-диспетчера
+        super().__init__(nodes, cluster_state)
+
+    @property
+    def schedule_position(self):
+        return getattr(self.cursors, "position", 0)
+
+    @schedule_position.setter
+    def schedule_position(self, position):
+        self.cursors.position = position
+
+    def set_shard(self, shard: int, shards_count: int):
+        '''Сдвигает позицию текущего потока-диспетчера в расписании, чтобы
+        диспетчеры начинали обход с разных нод'''
+        self.ensure_weights()
+        self.schedule_position = shard * len(self.schedule) // shards_count
+
+    def build_index(self):
+        '''Строим гладкое расписание цикла и индекс свободных ресурсов по его слотам'''
+        self.build_schedule()
+        if self.cluster_state is not None:
+            import numpy as np
+            self.schedule_array = np.asarray(self.schedule)
+        else:
+            self.capacity_index = CapacityIndex(self.nodes, self.schedule)
+
+    def find_node(self, task_compute_demand: float, task_data_size: float, exclude=()):
+        '''Первая по расписанию доступная нода, которая может принять задачу'''
+        if self.cluster_state is not None:
+            return self.cluster_state.first_feasible(task_compute_demand, task_data_size,
+                                                     order=self.schedule_array, exclude=exclude)
+        return self.capacity_index.find_first(task_compute_demand, task_data_size, exclude=exclude)
+
+    def find_slot(self, task_compute_demand: float, task_data_size: float, start: int, exclude=()):
+        '''Первый начиная со слота start (по кругу) слот расписания, нода которого
+        доступна и может принять задачу.
+        Возвращает (слот или None, расписание, в котором искали)'''
+        if self.cluster_state is not None:
+            schedule = self.schedule_array
+            return self.cluster_state.first_feasible_position(task_compute_demand, task_data_size,
+                                                              start % len(schedule), order=schedule,
+                                                              exclude=exclude), schedule
+        # индекс и расписание берем вместе: расписание могли перестроить в другом потоке
+        capacity_index = self.capacity_index
+        schedule = capacity_index.order
+        return capacity_index.find_first_position(task_compute_demand, task_data_size,
+                                                  start % len(schedule), exclude=exclude), schedule
+
+    def build_schedule(self):
+        '''Строим цикл: нода i встречается round(weight_i) раз, вхождения равномерно
+        распределены по циклу (stride scheduling: каждая нода "проходит" шаг total/weight_i,
+        следующей идет нода с наименьшим пройденным путем)'''
+        integer_weights = [max(1, round(weight)) for weight in self.normalized_nodes_weights]
+        total = sum(integer_weights)
+        passes = [(total / (2 * weight), i) for i, weight in enumerate(integer_weights)]
+        heapq.heapify(passes)
+
+        self.schedule = []
+        for _ in range(total):
+            node_pass, i = heapq.heappop(passes)
+            self.schedule.append(i)
+            heapq.heappush(passes, (node_pass + total / integer_weights[i], i))
+        self.schedule_position = 0
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
+        """
+        Распределяет задачу между нодами по алгоритму Smooth Weighted Round Robin:
+        задача отдается следующей по расписанию ноде, недоступные и занятые пропускаются.
+
+        :param task_compute_demand: Требуемая мощность задачи (FLOPS).
+        :param task_data_size: Объем данных задачи (байты).
+        :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (по умолчанию - момент передачи ноде).
+        :return: Нода, получившая задачу, или None, если задача отклонена.
+        """
+        self.ensure_weights()
+
+        # следующий по расписанию слот, нода которого может принять задачу; если резервирование
+        # не удалось (ноду занял другой поток), ищем дальше без этой ноды
+        tried = set()
         while True:
-            # Если все ноды отключены то пропускаем
-            if sum(self.normalized_nodes_weights) == 0:
-                logging.error(f"No available nodes to assign task {task_id}. Skipping...")
-                self.rejected_tasks += 1
+            slot, schedule = self.find_slot(task_compute_demand, task_data_size, self.schedule_position, tried)
+            if slot is None:
+                return self.reject_task(task_id)
+            i = int(schedule[slot])
+            reservation = self.nodes[i].try_reserve(task_compute_demand, task_data_size)
+            if reservation is not None:
                 break
+            tried.add(i)
+
+        self.schedule_position = (slot + 1) % len(schedule)
+        # отдаем задачу
+        self.nodes[i].start_task(reservation, task_id, arrival_time)
+        logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[i].node_id)
+        return self.nodes[i]
 
-            # определяем максимальный доступный вес оставшихся нод
-            max_available_weights = max(self.normalized_nodes_weights)
+    def reject_task(self, task_id: str):
+        # Если все ноды отключены или заняты то пропускаем
+        logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+        with self.lock:
+            self.rejected_tasks += 1
 
-            # определяем индекс ноды с максимальным весом
-            node_index = self.normalized_nodes_weights.index(max_available_weights)
-            # отдаем задачу
-            self.nodes[node_index].add_task(task_compute_demand, task_data_size, task_id)
+    def distribute_tasks(self, tasks: list) -> list:
+        """
+        Распределяет пакет задач по расписанию: позиция в расписании зависит от каждой
+        предыдущей задачи, поэтому задачи распределяются по одной.
 
-            # перещитываем веса нод
-            self.normalize_node_weights()
-            logging.error(f"Current weights of Nodes {self.normalized_nodes_weights}")
-            break
+        :param tasks: Список задач (task_compute_demand, task_data_size, task_id[, arrival_time]).
+        :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+        """
+        return [self.distribute_task(*task) for task in tasks]
 
 
 class RoundRobin:
-    def __init__(self, nodes: list):
+    def __init__(self, nodes: list, cluster_state=None):
         """
         Класс для распределения задач между нодами по алгоритму Round Robin.
 
         :param nodes: Список нод.
+        :param cluster_state: ClusterState этих же нод (необязательно). Если задан, нода выбирается
+                              векторным выражением по массивам кластера, а не по индексам.
         """
+        check_cluster_state(nodes, cluster_state)
         self.nodes = nodes
-        self.current_node_index = 0
+        self.cluster_state = cluster_state
+        self.cursors = threading.local()    # позиция обхода своя у каждого потока-диспетчера
         self.rejected_tasks = 0  # Счетчик отклоненных задач
-
-    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+        self.lock = threading.Lock()    # для одновременной работы нескольких диспетчеров
+
+        self.capacity_index = None
+        if cluster_state is None:
+            self.capacity_index = CapacityIndex(nodes)
+            for node in nodes:
+                node.subscribe(self.capacity_index.update)
+
+    @property
+    def current_node_index(self):
+        return getattr(self.cursors, "index", 0)
+
+    @current_node_index.setter
+    def current_node_index(self, index):
+        self.cursors.index = index
+
+    def set_shard(self, shard: int, shards_count: int):
+        '''Сдвигает позицию обхода текущего потока-диспетчера: диспетчер shard
+        начинает со своей части списка нод, а не все с первой ноды'''
+        self.current_node_index = shard * len(self.nodes) // shards_count
+
+    def find_node(self, task_compute_demand: float, task_data_size: float, start: int, exclude=()):
+        '''Первая начиная с позиции start (по кругу) доступная нода, которая может принять задачу'''
+        if self.cluster_state is not None:
+            return self.cluster_state.first_feasible(task_compute_demand, task_data_size, start, exclude=exclude)
+        return self.capacity_index.find_first(task_compute_demand, task_data_size, start, exclude=exclude)
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
         """
         Распределяет задачу между нодами по алгоритму Round Robin.
 
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
         :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (по умолчанию - момент передачи ноде).
+        :return: Нода, получившая задачу, или None, если задача отклонена.
         """
-        n = len(self.nodes)
+        # Первая начиная с текущей (по кругу) доступная нода, которая может принять задачу
         start_index = self.current_node_index
+        node_index, reservation = reserve_candidate(
+            self.nodes,
+            lambda tried: self.find_node(task_compute_demand, task_data_size, start_index, exclude=tried),
+            task_compute_demand, task_data_size)
+
+        if reservation is None:
+            logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+            with self.lock:
+                self.rejected_tasks += 1
+            return
 
-        while True:
-            node = self.nodes[self.current_node_index]
-            if node.is_available() and node.can_accept_task(task_compute_demand, task_data_size):
-                node.add_task(task_compute_demand, task_data_size, task_id)
-                break
-            else:
-                logging.warning(f"Node {node.node_id}: Unable to accept task {task_id}. Trying next node...")
+        self.current_node_index = node_index
+        self.nodes[node_index].start_task(reservation, task_id, arrival_time)
+        return self.nodes[node_index]
 
-            self.current_node_index = (self.current_node_index + 1) % n
-            if self.current_node_index == start_index:
-                logging.error(f"No available nodes to assign task {task_id}. Skipping...")
-                self.rejected_tasks += 1
-                break
+    def distribute_tasks(self, tasks: list) -> list:
+        """
+        Распределяет пакет задач (например, все задачи одного такта) по алгоритму Round Robin.
+        Ноды для всего пакета выбираются по индексам и локальной копии состояния
+        затронутых нод (BatchPlan), затем ресурсы резервируются одной блокировкой на ноду.
+
+        :param tasks: Список задач (task_compute_demand, task_data_size, task_id[, arrival_time]).
+        :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+        """
+        plan = BatchPlan(self.nodes)
+        rejected_count = 0
+        for position, task in enumerate(tasks):
+            task_compute_demand, task_data_size, task_id = task[:3]
+            node_index = self.find_node(task_compute_demand, task_data_size, self.current_node_index,
+                                        exclude=plan.unfit(task_compute_demand, task_data_size))
+            if node_index is None:
+                logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+                rejected_count += 1
+                continue
+            self.current_node_index = node_index
+            plan.assign(position, node_index, task_compute_demand, task_data_size)
+
+        return finish_batch(self, plan, tasks, rejected_count)
 
 
 class LeastConnection:
-    def __init__(self, nodes: list):
+    def __init__(self, nodes: list, cluster_state=None):
         """Класс для распределения задач между нодами по алгоритму Least Connection.
+            Количество подключений нод хранится в индексированной куче, которую ноды
+            обновляют при начале и завершении задач, поэтому выбор ноды стоит O(log n).
             :param nodes: Список нод.
+            :param cluster_state: ClusterState этих же нод (необязательно). Если задан, нода выбирается
+                                  векторным выражением по массивам кластера, а не по индексам.
         """
+        check_cluster_state(nodes, cluster_state)
+        self.cluster_state = cluster_state
         self.nodes = nodes
-        self.current_node_index = 0
-        self.nodes_connections = [0] * len(nodes)
         self.rejected_tasks = 0  # Счетчик отклоненных задач
-
-    def updated_nodes_connections(self, nodes):
-        for i in range(len(nodes)):
-            self.nodes_connections[i] = nodes[i].get_current_tasks_on_node()  # записываем сколько задач на каждой из нод
-
-    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+        self.lock = threading.Lock()    # для одновременной работы нескольких диспетчеров
+
+        self.node_indices = {node: i for i, node in enumerate(nodes)}
+        self.connections_index = None
+        self.capacity_index = None
+        if cluster_state is None:
+            self.connections_index = IndexedMinHeap([self.connections_key(node) for node in nodes])
+            self.capacity_index = CapacityIndex(nodes)
+            for node in nodes:
+                node.subscribe(self.on_node_changed)
+
+    @staticmethod
+    def connections_key(node):
+        """Ключ ноды в индексе: количество задач, у недоступной ноды - бесконечность"""
+        if not node.is_available():
+            return math.inf
+        return node.get_current_tasks_on_node()
+
+    def on_node_changed(self, node):
+        """Вызывается нодой при изменении количества задач или доступности"""
+        self.connections_index.update_with(self.node_indices[node], lambda: self.connections_key(node))
+        self.capacity_index.update(node)
+
+    def find_node(self, task_compute_demand: float, task_data_size: float, exclude=()):
+        """Нода с минимальным количеством подключений среди доступных нод,
+        которые могут принять задачу (при равенстве - первая по порядку)"""
+        if self.cluster_state is not None:
+            return self.cluster_state.argmin_feasible(self.cluster_state.running_tasks_count,
+                                                      task_compute_demand, task_data_size, exclude)
+        # в загруженном кластере обход кучи проверил бы все ноды - сначала проверяем, подходит ли хоть одна
+        if self.capacity_index.find_first(task_compute_demand, task_data_size, exclude=exclude) is None:
+            return None
+        return self.connections_index.find_min(
+            lambda i: i not in exclude and self.capacity_index.fits(i, task_compute_demand, task_data_size))
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
         """ Распределяет задачу между нодами по алгоритму Least Connections.
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
-        :param task_id: Идентификатор задачи. """
-        self.updated_nodes_connections(self.nodes)  # обновляем количество подключений перед распределением задач
-
-        for i in range(len(self.nodes)):
-            '''Проверяем доступна ли нода и может ли принять задачу,
-            после этого смотрим на количество подключений (задач  на ноде) и
-            выбираем с минимальным значением'''
-            if self.nodes[i].is_available() and self.nodes[i].can_accept_task(task_compute_demand, task_data_size):
-                continue
-            else:
-                self.nodes_connections[i] = 5000  # если нода недоступна, то ставим большое число подключений потому что потому
-
-        while True:
-            if all(conn == 5000 for conn in self.nodes_connections):  # если все ноды заняты или не могут взять задачу
-                logging.error(f"No available nodes to assign task {task_id}. Skipping...")
+        :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (по умолчанию - момент передачи ноде).
+        :return: Нода, получившая задачу, или None, если задача отклонена. """
+
+        # Ищем ноду с минимальным количеством подключений среди доступных нод,
+        # которые могут принять задачу (при равенстве - первую по порядку)
+        node_index, reservation = reserve_candidate(
+            self.nodes,
+            lambda tried: self.find_node(task_compute_demand, task_data_size, exclude=tried),
+            task_compute_demand, task_data_size)
+
+        if reservation is None:  # если все ноды заняты или не могут взять задачу
+            logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+            with self.lock:
                 self.rejected_tasks += 1
-                break
+            return
+
+        # отдаем задачу
+        self.nodes[node_index].start_task(reservation, task_id, arrival_time)
+        logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[node_index].node_id)
+        return self.nodes[node_index]
 
-            min_connections = min(self.nodes_connections)   # определяем минимальное кол-во подключений среди доступных нод
-            min_connections_node_index = self.nodes_connections.index(min_connections)  # определяем первый индекс среди доступных нод
-            #print(self.nodes_connections, min_connections_node_index)
-            # отдаем задачу
-            self.nodes[min_connections_node_index].add_task(task_compute_demand, task_data_size, task_id)
+    def distribute_tasks(self, tasks: list) -> list:
+        """
+        Распределяет пакет задач (например, все задачи одного такта) по алгоритму Least Connections.
+        Ноды для всего пакета выбираются по индексам и локальной копии состояния
+        затронутых нод (BatchPlan), затем ресурсы резервируются одной блокировкой на ноду.
+
+        :param tasks: Список задач (task_compute_demand, task_data_size, task_id[, arrival_time]).
+        :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+        """
+        if self.cluster_state is not None:
+            # по массивам кластера задача выбирается одним векторным выражением с учетом
+            # всех предыдущих задач пакета, план пакета не нужен
+            return [self.distribute_task(*task) for task in tasks]
+
+        plan = BatchPlan(self.nodes)
+        rejected_count = 0
+        for position, task in enumerate(tasks):
+            task_compute_demand, task_data_size, task_id = task[:3]
+            node_index = find_min_planned(self.connections_index, self.capacity_index, plan,
+                                          task_compute_demand, task_data_size)
+            if node_index is None:
+                logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+                rejected_count += 1
+                continue
+            plan.assign(position, node_index, task_compute_demand, task_data_size)
+            self.connections_index.update(node_index, plan.tasks_count(node_index))
+            logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[node_index].node_id)
 
-            # обновляем количество подключений
-            self.updated_nodes_connections(self.nodes)
-            logging.error(f"Current connections of Nodes {self.nodes_connections}")
-            break
+        return finish_batch(self, plan, tasks, rejected_count)
 
 
 class WeightedLeastConnection:
-    def __init__(self, nodes: list):
+    def __init__(self, nodes: list, cluster_state=None):
         """Класс для распределения задач между нодами по алгоритму Weighted Least Connection.
+            Вес WLC нод хранится в индексированной куче, которую ноды обновляют
+            при начале и завершении задач, поэтому выбор ноды стоит O(log n).
             :param nodes: Список нод.
+            :param cluster_state: ClusterState этих же нод (необязательно). Если задан, нода выбирается
+                                  векторным выражением по массивам кластера, а не по индексам.
         """
+        check_cluster_state(nodes, cluster_state)
+        self.cluster_state = cluster_state
         self.nodes = nodes
-        self.current_node_index = 0
-        self.nodes_connections = [0] * len(nodes)
         self.rejected_tasks = 0  # Счетчик отклоненных задач
+        self.lock = threading.Lock()    # для одновременной работы нескольких диспетчеров
 
         self.nodes_weights = [0.0] * len(nodes)
         self.normalized_nodes_weights = self.normalize_node_weights()   # один раз вычисляем вес нод
-        self.wlc_weight = [0.0] * len(nodes)
+
+        self.node_indices = {node: i for i, node in enumerate(nodes)}
+        self.wlc_index = None
+        self.capacity_index = None
+        if cluster_state is None:
+            self.wlc_index = IndexedMinHeap([self.wlc_key(node) for node in nodes])
+            self.capacity_index = CapacityIndex(nodes)
+            for node in nodes:
+                node.subscribe(self.on_node_changed)
+        else:
+            import numpy as np
+            self.normalized_weights_array = np.asarray(self.normalized_nodes_weights)
 
     def calc_node_weights(self, nodes):
         '''Вычисляем вес нод'''
@@ -192,71 +738,87 @@ class WeightedLeastConnection:
         '''Номрализуем веса нод в диапазоне от 1 до 10.
         Чем больше вес, тем лучше нода'''
 
-        normalized_nodes_weights = []
-
         # Перещитываем веса
         self.calc_node_weights(self.nodes)
-
-        max_weight = max(self.nodes_weights)
-        min_weight = min(self.nodes_weights)
-
-        for i in range(len(self.nodes_weights)):
-            normalized_weight = 1 + 9 * ((self.nodes_weights[i] - min_weight) / (max_weight - min_weight))
-            normalized_nodes_weights.append(normalized_weight)
-
-        return normalized_nodes_weights
-
-    def updated_nodes_connections(self, nodes):
-        for i in range(len(nodes)):
-            self.nodes_connections[i] = nodes[i].get_current_tasks_on_node()  # записываем сколько задач на каждой из нод
-
-    def calc_wlc_node_weights(self, nodes):
-        '''Вычисляем вес нод для Weighted Least Connections
-        чем меньше значение, тем лучше
-        w = active_connections/normalize_node_weight'''
-
-        # обновляем кол-во подключений, чтобы далее вызывать только функцию calc_wlc_node_weights
-        self.updated_nodes_connections(nodes)
-
-        for i in range(len(self.nodes)):
-            # вычисляем вес по формуле  w = Vc/normalize_node_weight
-            self.wlc_weight[i] = self.nodes_connections[i]/self.normalized_nodes_weights[i]
-
-    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+        return normalize_weights(self.nodes_weights)
+
+    def wlc_key(self, node):
+        '''Ключ ноды в индексе: w = Vc/normalize_node_weight, у недоступной ноды - бесконечность'''
+        if not node.is_available():
+            return math.inf
+        return node.get_current_tasks_on_node() / self.normalized_nodes_weights[self.node_indices[node]]
+
+    def on_node_changed(self, node):
+        """Вызывается нодой при изменении количества задач или доступности"""
+        self.wlc_index.update_with(self.node_indices[node], lambda: self.wlc_key(node))
+        self.capacity_index.update(node)
+
+    def find_node(self, task_compute_demand: float, task_data_size: float, exclude=()):
+        """Нода с минимальным весом WLC среди доступных нод,
+        которые могут принять задачу (при равенстве - первая по порядку)"""
+        if self.cluster_state is not None:
+            wlc_weights = self.cluster_state.running_tasks_count / self.normalized_weights_array
+            return self.cluster_state.argmin_feasible(wlc_weights, task_compute_demand, task_data_size, exclude)
+        # в загруженном кластере обход кучи проверил бы все ноды - сначала проверяем, подходит ли хоть одна
+        if self.capacity_index.find_first(task_compute_demand, task_data_size, exclude=exclude) is None:
+            return None
+        return self.wlc_index.find_min(
+            lambda i: i not in exclude and self.capacity_index.fits(i, task_compute_demand, task_data_size))
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str,
+                        arrival_time: float = None):
         """Распределяет задачу между нодами по алгоритму Weighted Least Connections.
         :param task_compute_demand: Требуемая мощность задачи (FLOPS).
         :param task_data_size: Объем данных задачи (байты).
         :param task_id: Идентификатор задачи.
+        :param arrival_time: Время поступления задачи по часам нод (по умолчанию - момент передачи ноде).
+        :return: Нода, получившая задачу, или None, если задача отклонена.
         """
 
-        # обновляем вес нод
-        self.calc_wlc_node_weights(self.nodes)
-
-        for i in range(len(self.nodes)):
-            '''Проверяем доступна ли нода и может ли принять задачу,
-            после этого смотрим на количество подключений (задач  на ноде) и
-            выбираем с минимальным значением'''
-            if self.nodes[i].is_available() and self.nodes[i].can_accept_task(task_compute_demand, task_data_size):
-                continue
-            else:
-                self.wlc_weight[i] = 5000 # если нода недоступна, то ставим ей большой вес
+        # Ищем ноду с минимальным весом WLC среди доступных нод,
+        # которые могут принять задачу (при равенстве - первую по порядку)
+        node_index, reservation = reserve_candidate(
+            self.nodes,
+            lambda tried: self.find_node(task_compute_demand, task_data_size, exclude=tried),
+            task_compute_demand, task_data_size)
 
-        while True:
-            if all(conn == 5000 for conn in self.wlc_weight):  # если все ноды заняты или не могут взять задачу
-                logging.error(f"No available nodes to assign task {task_id}. Skipping...")
-                #logging.error(f"No available nodes to assign task {task_id}. Skipping... Weights: {self.wlc_weight} {[self.nodes[i].is_available() for i in range(3)]}")
-                #logging.error(f"Can accept task {[self.nodes[i].can_accept_task(task_compute_demand, task_data_size) for i in range(3)]}")
+        if reservation is None:  # если все ноды заняты или не могут взять задачу
+            logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+            with self.lock:
                 self.rejected_tasks += 1
-                break
+            return
+
+        # отдаем задачу
+        self.nodes[node_index].start_task(reservation, task_id, arrival_time)
+        logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[node_index].node_id)
+        return self.nodes[node_index]
 
-            min_available_weights = min(self.wlc_weight)   # определяем минимальный вес среди доступных нод
-            min_weight_node_index = self.wlc_weight.index(min_available_weights)  # определяем первый индекс среди доступных нод
+    def distribute_tasks(self, tasks: list) -> list:
+        """
+        Распределяет пакет задач (например, все задачи одного такта) по алгоритму Weighted Least Connections.
+        Ноды для всего пакета выбираются по индексам и локальной копии состояния
+        затронутых нод (BatchPlan), затем ресурсы резервируются одной блокировкой на ноду.
 
-            # отдаем задачу
-            self.nodes[min_weight_node_index].add_task(task_compute_demand, task_data_size, task_id)
+        :param tasks: Список задач (task_compute_demand, task_data_size, task_id[, arrival_time]).
+        :return: Список нод, получивших задачи (None - задача отклонена), в порядке пакета.
+        """
+        if self.cluster_state is not None:
+            # по массивам кластера задача выбирается одним векторным выражением с учетом
+            # всех предыдущих задач пакета, план пакета не нужен
+            return [self.distribute_task(*task) for task in tasks]
+
+        plan = BatchPlan(self.nodes)
+        rejected_count = 0
+        for position, task in enumerate(tasks):
+            task_compute_demand, task_data_size, task_id = task[:3]
+            node_index = find_min_planned(self.wlc_index, self.capacity_index, plan,
+                                          task_compute_demand, task_data_size)
+            if node_index is None:
+                logging.warning("No available nodes to assign task %s. Skipping...", task_id)
+                rejected_count += 1
+                continue
+            plan.assign(position, node_index, task_compute_demand, task_data_size)
+            self.wlc_index.update(node_index, plan.tasks_count(node_index) / self.normalized_nodes_weights[node_index])
+            logging.debug("Task %s distributed to Node id = %s", task_id, self.nodes[node_index].node_id)
 
-            logging.error(f"Current WLC weights of Nodes {self.wlc_weight} | Task distributed to Node id = {min_weight_node_index + 1}")
-            logging.error(f"Current WLC Nodes params {self.wlc_weight} | node index = {min_weight_node_index}")
-            # обновляем вес нод
-            self.calc_wlc_node_weights(self.nodes)
-            break
\ No newline at end of file
+        return finish_batch(self, plan, tasks, rejected_count)
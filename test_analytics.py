@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+import pytest
+
+from analytics import (concat_histories, time_weighted_mean, time_weighted_means, segment_percentiles,
+                       summarize_histories)
+from metrics_buffer import MetricsBuffer
+
+
+def loop_weighted_average(points: list, active_only: bool = False) -> float:
+    # цикл, которым calc_tests_results считал средние взвешенные по истории ноды
+    if active_only:
+        points = [(t, value) for t, value in points if value > 0]
+    total_weighted = 0
+    total_time = 0
+    for i in range(len(points) - 1):
+        t_i, value_i = points[i]
+        t_next, _ = points[i + 1]
+        total_weighted += value_i * (t_next - t_i)
+        total_time += t_next - t_i
+    if total_weighted == 0:
+        return 0
+    return total_weighted / total_time
+
+
+def loop_percentile(values: list, q: float) -> float:
+    # линейная интерполяция между соседними по порядку значениями
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+HISTORIES = [
+    [(0.0, 0.0), (0.5, 40.0), (1.0, 80.0), (1.5, 0.0), (3.0, 20.0), (4.0, 0.0)],
+    [(0.2, 10.0), (0.7, 10.0), (2.0, 55.5), (2.1, 0.0)],
+    [],
+    [(1.0, 30.0)],
+    [(0.0, 0.0), (2.0, 0.0)],
+    [(0.0, 5.0), (1.0, 0.0), (2.0, 0.0), (3.0, 7.0), (3.0, 9.0), (5.0, 0.0)],
+]
+
+
+@pytest.mark.parametrize("active_only", [False, True])
+def test_time_weighted_means_match_loop(active_only):
+    times, values, offsets = concat_histories(HISTORIES)
+    means = time_weighted_means(times, values, offsets, active_only=active_only)
+
+    expected = [loop_weighted_average(history, active_only) for history in HISTORIES]
+    assert means.tolist() == pytest.approx(expected)
+    for history, mean in zip(HISTORIES, expected):
+        if history:
+            assert time_weighted_mean(*zip(*history), active_only=active_only) == pytest.approx(mean)
+
+
+def test_segment_percentiles_match_loop():
+    q = (0, 25, 50, 95, 99, 100)
+    _, values, offsets = concat_histories(HISTORIES)
+    result = segment_percentiles(values, offsets, q)
+
+    assert result.shape == (len(HISTORIES), len(q))
+    for history, row in zip(HISTORIES, result):
+        if not history:
+            assert np.isnan(row).all()
+            continue
+        history_values = [value for _, value in history]
+        assert row.tolist() == pytest.approx([loop_percentile(history_values, level) for level in q])
+
+
+def test_summarize_histories_accepts_buffers():
+    buffers = []
+    for history in HISTORIES:
+        buffer = MetricsBuffer()
+        for point in history:
+            buffer.append(point)
+        buffers.append(buffer)
+    summary = summarize_histories(buffers)
+
+    assert summary["weighted_mean"].tolist() == pytest.approx([loop_weighted_average(h) for h in HISTORIES])
+    assert summary["active_weighted_mean"].tolist() == pytest.approx(
+        [loop_weighted_average(h, active_only=True) for h in HISTORIES])
+    for history, mean, row in zip(HISTORIES, summary["mean"], summary["percentiles"]):
+        history_values = [value for _, value in history]
+        if not history:
+            assert np.isnan(mean) and np.isnan(row).all()
+            continue
+        assert mean == pytest.approx(sum(history_values) / len(history_values))
+        assert row.tolist() == pytest.approx([loop_percentile(history_values, level) for level in (50, 95, 99)])
@@ -0,0 +1,109 @@
+import math
+import random
+
+from cluster_index import IndexedMinHeap, CapacityIndex
+from Node import Node
+from simulation_clock import VirtualClock
+
+
+def check_heap(heap: IndexedMinHeap):
+    # свойство кучи и согласованность позиций
+    for position, i in enumerate(heap.heap):
+        assert heap.positions[i] == position
+        if position > 0:
+            parent = heap.heap[(position - 1) // 2]
+            assert not heap._less(i, parent)
+
+
+def check_tree(index: CapacityIndex):
+    # листья - свободные ресурсы нод, внутренние вершины - максимумы детей
+    for position, i in enumerate(index.order):
+        leaf = index.size + position
+        assert (index.free_flops[leaf], index.free_bandwidth[leaf]) == \
+            CapacityIndex.free_resources(index.nodes[i])
+    for v in range(1, index.size):
+        assert index.free_flops[v] == max(index.free_flops[2 * v], index.free_flops[2 * v + 1])
+        assert index.free_bandwidth[v] == max(index.free_bandwidth[2 * v], index.free_bandwidth[2 * v + 1])
+
+
+def create_nodes(count: int) -> list:
+    clock = VirtualClock()
+    return [Node(node_id=i + 1, compute_power_flops=1000 + i * 100, delay_seconds=0.1,
+                 bandwidth_bytes=1000, failure_probability=0, downtime_seconds=1, clock=clock)
+            for i in range(count)]
+
+
+def test_indexed_min_heap_updates():
+    rng = random.Random(1)
+    keys = [rng.randint(0, 20) for _ in range(50)]
+    heap = IndexedMinHeap(keys)
+    check_heap(heap)
+
+    for _ in range(500):
+        i = rng.randrange(len(keys))
+        keys[i] = rng.randint(0, 20)
+        heap.update(i, keys[i])
+        check_heap(heap)
+        # минимум - меньший ключ, при равенстве - меньший номер
+        assert heap.find_min() == min(range(len(keys)), key=lambda j: (keys[j], j))
+
+
+def test_indexed_min_heap_find_min_with_filter():
+    heap = IndexedMinHeap([5, 1, 3, 1, 4])
+    assert heap.find_min() == 1
+    assert heap.find_min(lambda i: i != 1) == 3
+    assert heap.find_min(lambda i: i in (0, 4)) == 4
+    assert heap.find_min(lambda i: False) is None
+    assert heap.find_min(limit=1) is None
+
+
+def test_capacity_index_follows_nodes():
+    nodes = create_nodes(13)
+    index = CapacityIndex(nodes)
+    for node in nodes:
+        node.subscribe(index.update)
+    check_tree(index)
+
+    rng = random.Random(2)
+    reservations = []
+    for _ in range(200):
+        node = rng.choice(nodes)
+        if reservations and rng.random() < 0.4:
+            reservation = reservations.pop(rng.randrange(len(reservations)))
+            reservation.node.release(reservation)
+        elif rng.random() < 0.1:
+            node.fail() if node.is_available() else node.recover()
+        else:
+            reservation = node.try_reserve(rng.randint(50, 400), rng.randint(10, 300))
+            if reservation is not None:
+                reservations.append(reservation)
+        check_tree(index)
+
+        # find_first совпадает с обходом нод по кругу
+        demand, size, start = rng.randint(50, 800), rng.randint(10, 500), rng.randrange(len(nodes))
+        fitting = [i for i in range(start, len(nodes)) if index.fits(i, demand, size)] + \
+                  [i for i in range(start) if index.fits(i, demand, size)]
+        assert index.find_first(demand, size, start) == (fitting[0] if fitting else None)
+        assert index.feasible_nodes(demand, size) == sorted(fitting)
+
+
+def test_capacity_index_repeated_nodes():
+    # порядок со слотами расписания: нода встречается несколько раз
+    nodes = create_nodes(3)
+    order = [2, 0, 2, 1, 2, 0]
+    index = CapacityIndex(nodes, order)
+    for node in nodes:
+        node.subscribe(index.update)
+
+    assert index.find_first_position(10, 10, start=1) == 1
+    nodes[0].try_reserve(nodes[0].compute_power_flops, 0)
+    check_tree(index)
+    assert index.free_flops[index.size + 1] == index.free_flops[index.size + 5] == 0
+    assert index.find_first_position(10, 10, start=1) == 2
+    assert index.find_first_position(10, 10, start=1, exclude={2}) == 3
+    assert index.find_first_position(10, 10, start=4, exclude={1, 2}) is None
+
+    nodes[2].fail()
+    check_tree(index)
+    assert index.free_flops[index.size + 4] == -math.inf
+    assert index.find_first(10, 10, start=5) == 1
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from metrics_buffer import MetricsBuffer, TimeWeightedAverage
+
+
+def loop_weighted_average(points: list, active_only: bool = False) -> float:
+    # цикл, которым main.py считал средние взвешенные до TimeWeightedAverage
+    if active_only:
+        points = [(t, value) for t, value in points if value > 0]
+    total_weighted = 0
+    total_time = 0
+    for i in range(len(points) - 1):
+        t_i, value_i = points[i]
+        t_next, _ = points[i + 1]
+        total_weighted += value_i * (t_next - t_i)
+        total_time += t_next - t_i
+    if total_weighted == 0:
+        return 0
+    return total_weighted / total_time
+
+
+def test_unbounded_buffer_grows():
+    buffer = MetricsBuffer(chunk_size=4)
+    assert len(buffer) == 0 and buffer.nbytes() == 0
+    points = [(float(t), t * 1.5) for t in range(11)]
+    for point in points:
+        buffer.append(point)
+
+    assert len(buffer) == 11
+    assert list(buffer) == points
+    assert buffer[-1] == points[-1]
+    assert buffer[2:5] == points[2:5]
+    times, values = buffer.to_numpy()
+    assert times.tolist() == [t for t, _ in points]
+    assert values.tolist() == [v for _, v in points]
+
+
+def test_ring_buffer_wraparound():
+    buffer = MetricsBuffer("q", capacity=4)
+    for t in range(3):
+        buffer.append((float(t), t))
+    assert list(buffer) == [(0.0, 0), (1.0, 1), (2.0, 2)]
+
+    # после заполнения новые точки вытесняют самые старые
+    for t in range(3, 10):
+        buffer.append((float(t), t))
+        expected = [(float(s), s) for s in range(t - 3, t + 1)]
+        assert len(buffer) == 4
+        assert list(buffer) == expected
+        assert [buffer[i] for i in range(-4, 4)] == expected + expected
+        times, values = buffer.to_numpy()
+        assert times.tolist() == [p[0] for p in expected]
+        assert values.tolist() == [p[1] for p in expected]
+
+    with pytest.raises(IndexError):
+        buffer[4]
+    buffer.clear()
+    assert len(buffer) == 0 and list(buffer) == []
+
+
+def test_ring_buffer_rejects_non_positive_capacity():
+    with pytest.raises(ValueError):
+        MetricsBuffer(capacity=0)
+
+
+def test_time_weighted_average_matches_loop():
+    rng = random.Random(3)
+    points = []
+    average = TimeWeightedAverage()
+    t = 0.0
+    for _ in range(200):
+        t += rng.random()
+        value = rng.choice([0, 0, rng.uniform(1, 100)])
+        points.append((t, value))
+        average.add(t, value)
+
+    assert average.average() == pytest.approx(loop_weighted_average(points))
+    assert average.average(active_only=True) == pytest.approx(loop_weighted_average(points, active_only=True))
+    assert TimeWeightedAverage().average() == 0
@@ -0,0 +1,80 @@
+import main
+from event_trace import EventTrace, TracingDistributor
+from Node import Node
+from random_streams import SeedStream
+from simulation_clock import VirtualClock
+from task_distributor import RoundRobin, WeightedRoundRobin, SmoothWeightedRoundRobin, task_distribution
+
+
+def create_nodes(powers: list) -> list:
+    clock = VirtualClock()
+    return [Node(node_id=i + 1, compute_power_flops=power, delay_seconds=0.1, bandwidth_bytes=1000,
+                 failure_probability=0, downtime_seconds=1, clock=clock)
+            for i, power in enumerate(powers)]
+
+
+class ThreeArgumentDistributor:
+    # дистрибьютор с интерфейсом distribute_task без arrival_time
+    def __init__(self, nodes: list):
+        self.distributor = RoundRobin(nodes)
+        self.task_ids = []
+
+    @property
+    def rejected_tasks(self):
+        return self.distributor.rejected_tasks
+
+    def distribute_task(self, task_compute_demand: float, task_data_size: float, task_id: str):
+        self.task_ids.append(task_id)
+        return self.distributor.distribute_task(task_compute_demand, task_data_size, task_id)
+
+
+def test_task_distribution_passes_arrival_time_by_name():
+    nodes = create_nodes([1000, 1000])
+    distributor = RoundRobin(nodes)
+    distribute = task_distribution(distributor)
+    assert distribute((10, 10, "T0", 0.5)) is nodes[0]
+    assert distribute((10, 10, "T1")) is nodes[0]
+
+    legacy = ThreeArgumentDistributor(nodes)
+    distribute = task_distribution(legacy)
+    assert distribute((10, 10, "T2", 0.5)) is nodes[0]
+    assert legacy.task_ids == ["T2"]
+
+
+def test_drivers_accept_three_argument_distributor(tmp_path):
+    clock = VirtualClock()
+    nodes_seed_stream, devices_seed_stream = SeedStream(1).spawn(2)
+    nodes = main.create_nodes(main.NODES_CONFIG, clock, nodes_seed_stream)
+    devices = main.create_devices(main.DEVICES_CONFIG, clock, devices_seed_stream)
+    distributor = ThreeArgumentDistributor(nodes)
+    trace = EventTrace(str(tmp_path / "trace.bin"), clock)
+
+    created = main.run_virtual_simulation(nodes, devices, TracingDistributor(distributor, trace), 2, clock)
+    trace.close()
+    assert created > 0
+    assert len(distributor.task_ids) == created
+
+
+def test_weighted_round_robin_remove_node_down_to_one():
+    nodes = create_nodes([1000, 2000, 3000, 4000])
+    distributor = WeightedRoundRobin(nodes)
+    assert distributor.distribute_task(10, 10, "T0") is nodes[3]
+
+    # после каждого удаления веса пересчитываются, с одной нодой все веса равны
+    for removed in (3, 1, 0):
+        distributor.remove_node(nodes[removed])
+        assert distributor.distribute_task(10, 10, f"T{removed}") is nodes[2]
+    assert distributor.nodes == [nodes[2]]
+    assert distributor.normalized_nodes_weights == [1.0]
+    assert distributor.rejected_tasks == 0
+
+
+def test_smooth_weighted_round_robin_equal_weights_is_round_robin():
+    # при равных весах SWRR вырождается в обычный Round Robin по кругу
+    nodes = create_nodes([1000] * 4)
+    distributor = SmoothWeightedRoundRobin(nodes)
+
+    chosen = [distributor.distribute_task(10, 10, f"T{i}") for i in range(12)]
+    assert distributor.normalized_nodes_weights == [1.0] * 4
+    assert chosen == nodes * 3
+    assert distributor.rejected_tasks == 0
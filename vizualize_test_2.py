@@ -1,27 +1,10 @@
 import matplotlib.pyplot as plt
 
-# Чтение файла
-with open('simulation_results.csv', 'r') as file:
-    lines = file.readlines()
+from analytics import summarize_histories
+from results_io import load_simulation_csv
 
-# Разделение данных на секции
-sections = {}
-current_section = None
-
-for line in lines:
-    line = line.strip()
-    if line.startswith('Node'):
-        current_section = line
-        sections[current_section] = []
-    elif line and current_section:  # Пропускаем пустые строки
-        sections[current_section].append(line)
-
-# Преобразование данных в словари для удобства работы
-node_data = {}
-for section, data in sections.items():
-    headers = data[0].split(',')
-    rows = [list(map(float, row.split(','))) for row in data[1:]]
-    node_data[section] = {headers[i]: [row[i] for row in rows] for i in range(len(headers))}
+# Чтение файла: общие метрики и секции историй нод {секция: {колонка: значения}}
+summary, node_data = load_simulation_csv('simulation_results.csv')
 
 
 
@@ -117,8 +100,8 @@ plt.show()
 
 
 # Общие метрики из первой строки файла
-total_created_tasks = float(lines[1].split(',')[1])
-total_rejected_tasks = float(lines[1].split(',')[2])
+total_created_tasks = summary['Total Created Tasks']
+total_rejected_tasks = summary['Total Rejected Tasks']
 # Создание графика
 labels = ['Созданные задачи', 'Отклоненные задачи']
 values = [total_created_tasks, total_rejected_tasks]
@@ -141,75 +124,37 @@ plt.show()
 
 
 
-# Посчитаем статичтические данные
-average_flops_consumption = dict()
-average_ethernet_consumption = dict()
-average_tasks_on_node = dict()
+# Посчитаем статичтические данные: по каждой метрике сразу для всех нод
+metrics = {
+    'Compute Load History': 'Load (FLOPS)',
+    'Network Load History': 'Network Load (Bytes)',
+    'Running Tasks History': 'Running Tasks Count',
+}
+summaries = {}
+for metric, column in metrics.items():
+    metric_sections = [section for section in node_data if metric in section]
+    histories = [(node_data[section]['Time (seconds)'], node_data[section][column]) for section in metric_sections]
+    summaries[metric] = (metric_sections, summarize_histories(histories))
 
 
-for section, data in node_data.items():
-    if 'Compute Load History' in section:
-        if section in average_flops_consumption:
-            load = data['Load (FLOPS)']
-            average_flops_consumption[section].append(load)
-        else:
-            load = data['Load (FLOPS)']
-            average_flops_consumption[section] = [load,]
+metric_sections, summary = summaries['Compute Load History']
+for node, mean in zip(metric_sections, summary['mean']):
+    print(f"Average load of {node} is {round(mean, 2)} %")
 
-    if 'Network Load History' in section:
-        if section in average_ethernet_consumption:
-            load = data['Network Load (Bytes)']
-            average_ethernet_consumption[section].append(load)
-        else:
-            load = data['Network Load (Bytes)']
-            average_ethernet_consumption[section] = [load,]
 
-    if 'Running Tasks History' in section:
-        if section in average_tasks_on_node:
-            load = data['Running Tasks Count']
-            average_tasks_on_node[section].append(load)
-        else:
-            load = data['Running Tasks Count']
-            average_tasks_on_node[section] = [load,]
+metric_sections, summary = summaries['Network Load History']
+for node, mean in zip(metric_sections, summary['mean']):
+    print(f"Average ethernet of {node} is {round(mean, 2)} %")
 
-
-for node in average_flops_consumption.keys():
-    #print(average_flops_consumption[node][0])
-    print(f"Average load of {node} is {round(sum(average_flops_consumption[node][0]) / len(average_flops_consumption[node][0]), 2)} %")
-
-
-for node in average_ethernet_consumption.keys():
-    print(f"Average ethernet of {node} is {round(sum(average_ethernet_consumption[node][0]) / len(average_ethernet_consumption[node][0]), 2)} %")
-
-for node in average_tasks_on_node.keys():
+metric_sections, summary = summaries['Running Tasks History']
+for node, mean in zip(metric_sections, summary['mean']):
     print(
-        f"Average tasks of {node} is {round(sum(average_tasks_on_node[node][0]) / len(average_tasks_on_node[node][0]), 2)} piece")
+        f"Average tasks of {node} is {round(mean, 2)} piece")
 
 print(f"Total created tasks: {total_created_tasks}, \nTotal rejected tasks: {total_rejected_tasks}")
 
 
-# Вычисление среднего количества задач
-total_weighted_tasks = 0  # Сумма "время-задачи"
-total_time = 0  # Общая длительность
-
-
+# Среднее взвешенное по времени количество задач на каждой ноде
 print()
-for section, data in node_data.items():
-    if 'Running Tasks History' in section:
-        time = data['Time (seconds)']
-        running_tasks = data['Running Tasks Count']
-
-
-        for i in range(len(time) - 1):
-            t_i = time[i]
-            t_next = time[i+1]
-            n_i = running_tasks[i]
-            n_next = running_tasks[i + 1]
-
-            delta_t = t_next - t_i  # Длительность интервала
-            total_weighted_tasks += n_i * delta_t  # Вклад в "время-задачи"
-            total_time += delta_t  # Вклад в общую длительност
-
-        weighted_avg = total_weighted_tasks / total_time
-
-        print(f"Среднее взвешенное: {weighted_avg:.6f}")
\ No newline at end of file
+for weighted_avg in summary['weighted_mean']:
+    print(f"Среднее взвешенное: {weighted_avg:.6f}")